@@ -0,0 +1,97 @@
+"""
+Frame-time benchmark of the all-channel live overview.
+
+Feeds synthetic multi-channel windows into LivePlotWidget.update_overview
+and measures, per frame, the time to prepare the vertex buffer on the CPU
+and the time to render the canvas. Rendering uses whatever OpenGL the
+machine provides, e.g. Mesa llvmpipe on machines without a discrete GPU;
+if no OpenGL context is available only the preparation time is reported.
+
+Run from the repository root:
+
+    python -m benchmarks.overview_frame_time --offscreen
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+
+def summarize(name, times, budget):
+    """
+    Print statistics of frame times in milliseconds.
+
+    Parameters:
+    - name (str): Label of the measured stage.
+    - times (list): Frame times in seconds.
+    - budget (float): Time available per frame in seconds.
+    """
+    times_ms = np.asarray(times) * 1000
+    print(f"{name:>8}: mean {times_ms.mean():7.2f} ms  p95 {np.percentile(times_ms, 95):7.2f} ms  "
+          f"max {times_ms.max():7.2f} ms  ({np.mean(times_ms <= budget * 1000) * 100:.0f} % within budget)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame-time benchmark of the all-channel live overview")
+    parser.add_argument('--channels', type=int, default=32, help="Number of channels")
+    parser.add_argument('--window', type=float, default=5, help="Live window length in seconds")
+    parser.add_argument('--sampling-rate', type=float, default=2000, help="Sampling rate in Hz")
+    parser.add_argument('--frames', type=int, default=200, help="Number of frames to measure")
+    parser.add_argument('--width', type=int, default=1200, help="Widget width in pixels")
+    parser.add_argument('--height', type=int, default=700, help="Widget height in pixels")
+    parser.add_argument('--display-rate', type=float, default=60, help="Target display rate in Hz")
+    parser.add_argument('--no-decimate', action='store_true', help="Draw every sample instead of min/max per pixel")
+    parser.add_argument('--offscreen', action='store_true', help="Use the Qt offscreen platform, no display needed")
+    args = parser.parse_args()
+
+    if args.offscreen:
+        os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+
+    from PyQt5.QtWidgets import QApplication
+    from view.livePlotWidget import LivePlotWidget
+
+    app = QApplication(sys.argv[:1])
+    widget = LivePlotWidget(args.window, decimate=not args.no_decimate)
+    widget.resize(args.width, args.height)
+    widget.show()
+    app.processEvents()
+    widget.overview_button.setChecked(True)
+
+    num_samples = int(args.window * args.sampling_rate)
+    time_points = np.linspace(0, args.window, num_samples)
+    rng = np.random.default_rng(0)
+    windows = rng.normal(0, 1000, size=(4, args.channels, num_samples)).astype(np.float32)
+
+    prepare_times = []
+    render_times = []
+    can_render = True
+    for frame in range(args.frames):
+        start = time.perf_counter()
+        widget.update_overview(time_points, windows[frame % len(windows)])
+        prepare_times.append(time.perf_counter() - start)
+
+        if can_render:
+            start = time.perf_counter()
+            try:
+                widget.canvas.render()
+            except Exception as e:
+                print(f"Rendering not available, reporting preparation only ({type(e).__name__}: {e})")
+                can_render = False
+                continue
+            render_times.append(time.perf_counter() - start)
+
+    budget = 1 / args.display_rate
+    print(f"{args.channels} channels x {num_samples} samples, "
+          f"{len(widget.overview_vertices)} vertices, {args.frames} frames, "
+          f"budget {budget * 1000:.1f} ms at {args.display_rate:g} Hz")
+    summarize("prepare", prepare_times, budget)
+    if render_times:
+        summarize("render", render_times, budget)
+        summarize("total", np.add(prepare_times[:len(render_times)], render_times), budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+End-to-end benchmark of the acquisition path, without Qt.
+
+For every combination of channel count, samples per packet and replay
+speed, a synthetic source is streamed by EMGTCPServer over loopback to
+EMGTCPClient, and every received packet is ingested into the live buffer,
+recording and decimation pyramid of a SignalProcessor. Per run it reports:
+
+- packets per second received and ingested
+- latency percentiles from the sender timestamp of a frame to the client
+  having its packet (receive) and to the packet being ingested (end to end)
+- lost, duplicate, misaligned (content does not match the sequence number)
+  and missing packets
+- CPU time per packet of the server pacing thread, the client receive and
+  the ingest stage
+
+Results are written as JSON to track regressions between releases.
+Run from the repository root:
+
+    python -m benchmarks.streaming --channels 32 64 --speed 10 unpaced --output results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from service.emg_source import write_source
+from service.signal_processor import SignalProcessor
+from service.tcp_client import EMGTCPClient
+from service.tcp_server import EMGTCPServer, parse_speed
+
+
+def percentiles_ms(values):
+    """
+    Summarize latencies in milliseconds.
+
+    Parameters:
+    - values (np.ndarray): Latencies in seconds.
+
+    Returns:
+    - dict: 50th, 90th, 99th percentile and maximum in ms.
+    """
+    if len(values) == 0:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    values_ms = values * 1000
+    p50, p90, p99 = np.percentile(values_ms, [50, 90, 99])
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(values_ms.max())}
+
+
+def per_packet_us(seconds, packets):
+    """Time per packet in microseconds, None if unknown"""
+    if seconds is None or packets == 0:
+        return None
+    return seconds / packets * 1e6
+
+
+def run_case(directory, channels, samples_per_packet, speed, packets_per_send, num_packets,
+             sampling_rate, source_packets):
+    """
+    Stream one configuration and measure it.
+
+    Parameters:
+    - directory (str): Directory for the synthetic source file.
+    - channels (int): Number of channels.
+    - samples_per_packet (int): Samples per channel and packet.
+    - speed (float): Replay speed relative to real time, None for unpaced.
+    - packets_per_send (int): Packets aggregated into one frame by the server.
+    - num_packets (int): Number of packets to stream.
+    - sampling_rate (float): Sampling rate of the synthetic signal in Hz.
+    - source_packets (int): Number of distinct packets in the source, the stream loops over them.
+
+    Returns:
+    - dict: Configuration and measurements of the run.
+    """
+    source_file = os.path.join(directory, f"source_{channels}x{samples_per_packet}.npy")
+    if not os.path.exists(source_file):
+        rng = np.random.default_rng(0)
+        write_source(
+            source_file,
+            rng.normal(0, 1000, size=(source_packets, channels, samples_per_packet)).astype(np.float32),
+            sampling_rate
+        )
+
+    server = EMGTCPServer(port=0, source_file=source_file, channels=channels, speed=speed,
+                          max_packets=num_packets, packets_per_send=packets_per_send)
+    client = EMGTCPClient(channels=channels, samples_per_packet=samples_per_packet)
+    processor = SignalProcessor(tcp_server=server, tcp_client=client)
+    source = server.packets
+
+    server.start()
+    client.port = server.server_socket.getsockname()[1]
+    client.connect()
+    processor.is_recording = True
+
+    receive_latency = np.empty(num_packets)
+    ingest_latency = np.empty(num_packets)
+    receive_cpu = 0.0
+    ingest_cpu = 0.0
+    misaligned = 0
+    received = 0
+    first_time = last_time = None
+
+    while received < num_packets:
+        cpu_start = time.thread_time()
+        packet = client.receive_data()
+        cpu_received = time.thread_time()
+        received_time = time.time()
+        if packet is None:
+            break
+        processor.ingest(packet)
+        ingested_time = time.time()
+        ingest_cpu += time.thread_time() - cpu_received
+        receive_cpu += cpu_received - cpu_start
+
+        if first_time is None:
+            first_time = received_time
+        last_time = ingested_time
+        receive_latency[received] = received_time - client.last_timestamp
+        ingest_latency[received] = ingested_time - client.last_timestamp
+        if not np.array_equal(packet, source[client.packet_sequence % len(source)]):
+            misaligned += 1
+        received += 1
+
+    server.finished.wait(5)
+    server_cpu = server.pacing_cpu_time
+    throughput = server.throughput_stats()
+    client.close()
+    server.stop()
+
+    seconds = last_time - first_time if received > 1 else 0.0
+    return {
+        'channels': channels,
+        'samples_per_packet': samples_per_packet,
+        'speed': 'unpaced' if speed is None else speed,
+        'packets_per_send': packets_per_send,
+        'packets': num_packets,
+        'received_packets': received,
+        'packets_per_s': received / seconds if seconds > 0 else None,
+        'bytes_per_s': throughput['bytes_per_s'],
+        'target_packets_per_s': None if speed is None else speed * sampling_rate / samples_per_packet,
+        'latency_ms': {
+            'receive': percentiles_ms(receive_latency[:received]),
+            'end_to_end': percentiles_ms(ingest_latency[:received]),
+        },
+        'lost_packets': client.lost_packets,
+        'duplicate_packets': client.duplicate_packets,
+        'misaligned_packets': misaligned,
+        'missing_packets': num_packets - received,
+        'cpu_us_per_packet': {
+            'server': per_packet_us(server_cpu, throughput['packets']),
+            'client_receive': per_packet_us(receive_cpu, received),
+            'ingest': per_packet_us(ingest_cpu, received),
+        },
+    }
+
+
+def print_result(result):
+    """Print the main figures of one run on one line"""
+    def fmt(value, spec):
+        return '-' if value is None else format(value, spec)
+
+    latency = result['latency_ms']['end_to_end']
+    cpu = result['cpu_us_per_packet']
+    print(f"{result['channels']:>4} ch x {result['samples_per_packet']:>3}  speed {str(result['speed']):>8}  "
+          f"{fmt(result['packets_per_s'], '9.0f')} packets/s  "
+          f"latency p50 {fmt(latency['p50'], '7.2f')} p99 {fmt(latency['p99'], '7.2f')} ms  "
+          f"lost {result['lost_packets']} misaligned {result['misaligned_packets']} "
+          f"missing {result['missing_packets']}  "
+          f"cpu/packet server {fmt(cpu['server'], '.1f')} receive {fmt(cpu['client_receive'], '.1f')} "
+          f"ingest {fmt(cpu['ingest'], '.1f')} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end streaming benchmark of server, client and SignalProcessor")
+    parser.add_argument('--channels', type=int, nargs='+', default=[32], help="Channel counts")
+    parser.add_argument('--samples-per-packet', type=int, nargs='+', default=[18], help="Packet sizes in samples")
+    parser.add_argument('--speed', type=parse_speed, nargs='+', default=[10.0, 100.0, None],
+                        help="Replay speeds relative to real time, or 'unpaced'")
+    parser.add_argument('--packets-per-send', type=int, default=1, help="Packets aggregated into one frame")
+    parser.add_argument('--packets', type=int, default=20000, help="Packets streamed per run")
+    parser.add_argument('--max-seconds', type=float, default=10,
+                        help="Limit the packets of paced runs to about this duration")
+    parser.add_argument('--sampling-rate', type=float, default=2000, help="Sampling rate in Hz")
+    parser.add_argument('--source-packets', type=int, default=2000, help="Distinct packets in the synthetic source")
+    parser.add_argument('--label', default=None, help="Label stored with the results, e.g. a release")
+    parser.add_argument('--output', default=None, help="JSON file to write the results to")
+    parser.add_argument('--verbose', action='store_true', help="Show the output of server and client")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for channels in args.channels:
+            for samples_per_packet in args.samples_per_packet:
+                for speed in args.speed:
+                    num_packets = args.packets
+                    if speed is not None:
+                        packets_per_second = speed * args.sampling_rate / samples_per_packet
+                        num_packets = max(1, min(num_packets, int(args.max_seconds * packets_per_second)))
+                    with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                        result = run_case(directory, channels, samples_per_packet, speed, args.packets_per_send,
+                                          num_packets, args.sampling_rate, args.source_packets)
+                    results.append(result)
+                    print_result(result)
+
+    if args.output:
+        report = {
+            'benchmark': 'streaming',
+            'label': args.label,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'sampling_rate': args.sampling_rate,
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
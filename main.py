@@ -1,13 +1,33 @@
 from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton
 from view.mainView import MainView
 from viewModel.mainViewModel import MainViewModel
+from service.tcp_server import parse_speed
 
+import argparse
 import sys
 
-app = QApplication(sys.argv)
+parser = argparse.ArgumentParser(description="Applied Programming - EMG Data Viewer")
+parser.add_argument('--record-dir', default=None,
+                    help="Stream recordings into memory-mapped session files in this directory")
+parser.add_argument('--source', default=None,
+                    help="Memory-mapped .npy source for the simulated stream (see service/emg_source.py)")
+parser.add_argument('--asyncio', action='store_true',
+                    help="Use the asyncio server and client on an event-loop thread")
+parser.add_argument('--speed', type=parse_speed, default=1.0,
+                    help="Replay speed relative to real time, e.g. 10 or 100, or 'unpaced'")
+parser.add_argument('--trace', action='store_true',
+                    help="Trace packet latencies and show the overlay (toggle with Ctrl+T)")
+args, qt_args = parser.parse_known_args()
 
-main_view_model = MainViewModel()
+app = QApplication(sys.argv[:1] + qt_args)
+
+main_view_model = MainViewModel(
+    recording_dir=args.record_dir, source_file=args.source, use_asyncio=args.asyncio,
+    speed=args.speed
+)
 main_view = MainView(main_view_model)
+if args.trace:
+    main_view.set_latency_overlay(True)
 print("MainView initialized with ViewModel.")
 main_view.show()
 print("MainView is now visible.")
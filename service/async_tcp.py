@@ -0,0 +1,301 @@
+"""
+asyncio implementations of the EMG server and client.
+
+They use the same wire format as EMGTCPServer and EMGTCPClient (see
+service/protocol.py) and can be mixed with them. All sockets are owned by
+one event loop: pacing is timer-driven with loop.call_at, the client reads
+with loop.sock_recv_into into preallocated buffers, and stopping cancels
+the pending tasks and timers instead of closing sockets underneath
+blocked threads.
+"""
+
+import asyncio
+import os
+import socket
+import time
+from collections import deque
+
+from service import protocol
+from service.tcp_client import EMGTCPClient
+from service.tcp_server import (
+    SLOW_CLIENT_POLICIES, check_stream_options, frame_buffers, lateness_stats, load_packets, rate_stats
+)
+
+
+class AsyncEMGTCPServer:
+    """
+    Simulated EMG device serving any number of clients from one event loop.
+
+    Every frame of packets_per_send packets is built once per period by a
+    loop.call_at timer and written to all connected clients; its payload is
+    a memoryview of the packet-major source. The transport write buffer of a
+    client is its send queue; when it holds more than max_queue_packets
+    packets the slow-client policy either skips the frame for that client
+    ('drop') or disconnects it ('disconnect').
+
+    speed and max_packets work as in EMGTCPServer: unpaced frames are sent
+    as soon as no write buffer is full, and once max_packets packets are
+    written the connections are closed after their buffers are flushed.
+    """
+
+    SLOW_CLIENT_POLICIES = SLOW_CLIENT_POLICIES
+
+    def __init__(self, host='localhost', port=12345, pkl_file=os.path.join(os.path.dirname(__file__), 'recording.pkl'),
+                 protocol_version=protocol.PROTOCOL_VERSION, source_file=None,
+                 max_queue_packets=500, slow_client_policy='drop', packets_per_send=1,
+                 speed=1.0, max_packets=None, channels=32):
+        check_stream_options(slow_client_policy, packets_per_send, speed, max_packets)
+        self.host = host
+        self.port = port
+        self.pkl_file = pkl_file
+        self.source_file = source_file
+        self.protocol_version = protocol_version
+        self.max_queue_packets = max_queue_packets
+        self.slow_client_policy = slow_client_policy
+        self.packets_per_send = packets_per_send
+        self.speed = speed
+        self.max_packets = max_packets
+        self.CHANNELS = channels
+        self.server = None
+        self.clients = {}  # StreamWriter -> number of packets dropped
+        self.client_tasks = set()  # running handle_client tasks
+        self.running = False
+        self.timer = None
+        self.send_lateness = deque(maxlen=10000)  # seconds behind schedule per frame
+        self.finished = None  # asyncio.Event, set when max_packets packets were written
+        self.tracer = None  # LatencyTracer while tracing is enabled
+
+        self.packets, self.sampling_rate = load_packets(pkl_file, source_file, self.CHANNELS)
+        self.SAMPLES_PER_PACKET = self.packets.shape[2]
+        self.emg_signal = self.packets.transpose(1, 2, 0)
+        self.sleep_time = self.SAMPLES_PER_PACKET / self.sampling_rate
+        self.packet_size = self.CHANNELS * self.SAMPLES_PER_PACKET * 4
+
+    async def start(self):
+        """Start listening, packets are paced once the first client connected"""
+        self.window_index = 0
+        self.sequence = 0
+        self.next_time = None
+        self.send_lateness.clear()
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.stream_start = None
+        self.stream_end = None
+        self.finished = asyncio.Event()
+        self.running = True
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"Server started on {self.host}:{self.port}")
+
+    async def handle_client(self, reader, writer):
+        """Serve one connection: register it for the fan-out and wait until it is closed"""
+        address = writer.get_extra_info('peername')
+        print(f"New connection from {address}")
+        self.clients[writer] = 0
+        task = asyncio.current_task()
+        self.client_tasks.add(task)
+        if self.timer is None:
+            loop = asyncio.get_running_loop()
+            self.next_time = loop.time()
+            if self.stream_start is None:
+                self.stream_start = self.next_time
+            self.timer = loop.call_at(self.next_time, self.send_packet)
+        try:
+            # Clients do not send anything, reading only detects the disconnect
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            dropped = self.clients.pop(writer, 0)
+            self.client_tasks.discard(task)
+            writer.close()
+            print(f"Client {address} disconnected ({dropped} packets dropped)")
+
+    def send_packet(self):
+        """Timer callback: build the next frame once, write it to all clients and schedule the next one"""
+        loop = asyncio.get_running_loop()
+        if not self.running or not self.clients:
+            self.timer = None
+            return
+        max_buffered = self.max_queue_packets * self.packet_size
+        if self.speed is None:
+            if any(writer.transport.get_write_buffer_size() >= max_buffered for writer in self.clients):
+                # Unpaced: wait for the slowest client instead of dropping
+                self.timer = loop.call_later(0.001, self.send_packet)
+                return
+        else:
+            self.send_lateness.append(loop.time() - self.next_time)
+
+        # Frames do not wrap around the end of the data
+        count = min(self.packets_per_send, len(self.packets) - self.window_index)
+        if self.max_packets is not None:
+            count = min(count, self.max_packets - self.sequence)
+        buffers = frame_buffers(self.packets, self.window_index, count, self.sequence, self.protocol_version)
+        frame_size = sum(len(buffer) for buffer in buffers)
+
+        for writer in list(self.clients):
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() >= max_buffered:
+                if self.slow_client_policy == 'disconnect':
+                    print(f"Disconnecting slow client {writer.get_extra_info('peername')}")
+                    writer.transport.abort()
+                    continue
+                self.clients[writer] += count
+                continue
+            writer.writelines(buffers)
+            self.bytes_sent += frame_size
+        if self.tracer is not None:
+            self.trace_frame(loop, count)
+
+        self.sequence += count
+        self.packets_sent = self.sequence
+        self.window_index = (self.window_index + count) % len(self.packets)
+
+        if self.max_packets is not None and self.sequence >= self.max_packets:
+            print(f"Sent {self.sequence} packets, finishing the stream.")
+            self.stream_end = loop.time()
+            self.timer = None
+            for writer in list(self.clients):
+                writer.close()  # written data is flushed before closing
+            self.finished.set()
+            return
+
+        if self.speed is None:
+            self.timer = loop.call_soon(self.send_packet)
+            return
+        # Ensure constant sampling rate, late packets are caught up
+        self.next_time += count * self.sleep_time / self.speed
+        self.timer = loop.call_at(self.next_time, self.send_packet)
+
+    def trace_frame(self, loop, count):
+        """Stamp the traced packets of the frame that was just written"""
+        sent = time.perf_counter()
+        # Schedule on the perf_counter clock of the tracer
+        scheduled = None if self.speed is None else sent - (loop.time() - self.next_time)
+        for traced in self.tracer.sampled(self.sequence, count):
+            if scheduled is not None:
+                self.tracer.stamp(traced, 'scheduled', scheduled)
+            self.tracer.stamp(traced, 'send', sent)
+
+    def jitter_stats(self):
+        """
+        Statistics of how late frames were sent relative to the schedule.
+
+        Returns:
+        - dict: Number of frames and mean, 99th percentile and maximum lateness in ms.
+        """
+        return lateness_stats(self.send_lateness)
+
+    def throughput_stats(self):
+        """
+        Achieved throughput since the first client connected, up to now or the end of the stream.
+
+        Returns:
+        - dict: Packets streamed, bytes written to all clients, seconds, and packets and bytes per second.
+        """
+        if self.stream_start is None:
+            return rate_stats(self.packets_sent, self.bytes_sent, 0.0)
+        end = self.stream_end if self.stream_end is not None else asyncio.get_running_loop().time()
+        return rate_stats(self.packets_sent, self.bytes_sent, end - self.stream_start)
+
+    async def stop(self):
+        """Stop pacing, close all connections and wait until the server is closed"""
+        self.running = False
+        if self.stream_start is not None and self.stream_end is None:
+            self.stream_end = asyncio.get_running_loop().time()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.transport.abort()
+            # Wait for the handlers to see their connection closed
+            await asyncio.gather(*self.client_tasks, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+        stats = self.jitter_stats()
+        print(f"Server stopped (send lateness over {stats['frames']} frames: "
+              f"mean {stats['mean_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms)")
+        stats = self.throughput_stats()
+        print(f"Throughput: {stats['packets']} packets in {stats['seconds']:.2f} s, "
+              f"{stats['packets_per_s']:.0f} packets/s, {stats['bytes_per_s'] / 1e6:.2f} MB/s")
+
+
+class AsyncEMGTCPClient(EMGTCPClient):
+    """
+    asyncio variant of EMGTCPClient.
+
+    Shares the receive buffers, frame parsing and packet statistics of
+    EMGTCPClient; connect, receive_data and close are coroutines running on
+    the event loop.
+    """
+
+    async def connect(self):
+        """Connect to the TCP server"""
+        loop = asyncio.get_running_loop()
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setblocking(False)
+            await loop.sock_connect(self.socket, (self.host, self.port))
+            self.connected = True
+            print(f"Connected to server at {self.host}:{self.port}")
+            self.reset_stats()
+            self.t0 = time.time()
+        except OSError as e:
+            print(f"Error connecting to server: {e}")
+            self.socket.close()
+            self.connected = False
+
+    async def receive_exact(self, buffer):
+        """
+        Fill the whole buffer from the socket, however the stream is split up.
+
+        Returns False if the connection was closed before the buffer was full.
+        """
+        loop = asyncio.get_running_loop()
+        view = memoryview(buffer)
+        received = 0
+        while received < len(view):
+            count = await loop.sock_recv_into(self.socket, view[received:])
+            if count == 0:
+                return False
+            received += count
+        return True
+
+    async def receive_data(self):
+        """
+        Receive the next EMG packet from the server.
+
+        Returns a (channels, samples) array backed by the client's receive
+        buffer. It is overwritten by the next calls, copy it to keep it.
+        """
+        if not self.connected:
+            print("Not connected to server")
+            return None
+
+        packet = self.next_packet()
+        if packet is not None:
+            return packet
+
+        try:
+            while True:
+                for buffer in self.receive_buffers():
+                    if not await self.receive_exact(buffer):
+                        print("Connection closed by server")
+                        self.connected = False
+                        return None
+                packet = self.complete_frame()
+                if packet is not None:
+                    return packet
+                # Duplicate dropped, wait for the next frame
+
+        except (OSError, ValueError) as e:
+            print(f"Error receiving data: {e}")
+            self.connected = False
+            return None
+
+    async def close(self):
+        """Close the connection"""
+        EMGTCPClient.close(self)
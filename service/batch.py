@@ -0,0 +1,434 @@
+"""
+Batch processing of recordings without the GUI, on all CPU cores.
+
+Every input recording is processed with one or more of the modes of the
+recording view (raw, rms, envelope, filter) over all channels. The work is
+split into tasks that run in a ProcessPoolExecutor, either
+
+- by channel: each task processes a group of channels over the whole
+  recording.
+- by time block (default): each task processes all channels of a block of
+  samples.
+
+Within a task the samples are processed in chunks. Every chunk goes through
+dsp.process_block together with the samples it needs beyond both of its
+edges (dsp.process_range), so the results match dsp.process_block over the
+whole recording, like the recording view and the export:
+
+| Mode     | Overlap at both edges   | Result against process_block over the whole recording |
+|----------|-------------------------|--------------------------------------------------------|
+| raw      | none                    | exact                                                  |
+| rms      | half the window         | exact, centered moving RMS                             |
+| envelope | 1 s                     | ~0.02 % relative RMS error on band-pass EMG, more on    |
+|          |                         | broadband signals (see dsp.block_overlap)              |
+| filter   | impulse response length | within 1e-6 of the impulse response peak (sosfiltfilt) |
+
+Inputs are session files of MemmapRecordingStore (`.emgrec`), pickled
+recordings as used by the server (`.pkl`, converted once into a temporary
+source file in the output directory) and memory-mapped source files (`.npy` with `.json` sidecar,
+see service/emg_source.py). Directories are searched for these files.
+Tasks of all inputs share one pool, so a batch of short sessions keeps
+every core busy as well.
+
+For every input and mode, `<name>_<mode>.npy` is written: float32 of shape
+(channels, samples) in Fortran order, like the `.npy` export, all tasks
+writing their part into the same memory-mapped file. A `.json` sidecar
+holds the sampling rate, mode and processing parameters. Run from the
+repository root:
+
+    python -m service.batch recordings/ --mode filter rms --output-dir processed
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from service.dsp import block_overlap, design_filter, filtfilt_padlen, process_range
+from service.emg_source import convert_pickle, load_source, sidecar_path
+from service.recording_store import MemmapRecordingStore
+
+MODES = ('raw', 'rms', 'envelope', 'filter')
+CHUNK_SAMPLES = 1 << 16  # samples per channel processed at a time within a task
+
+# One task: process channels [first_channel, last_channel) of samples [start, stop)
+BatchTask = namedtuple(
+    'BatchTask',
+    ['input_path', 'output_path', 'mode', 'parameters', 'first_channel', 'last_channel', 'start', 'stop']
+)
+
+
+class SourceRecording:
+    """
+    Read access to a packet-major source file with the interface of a recording store.
+    """
+
+    def __init__(self, source_file):
+        """
+        Parameters:
+        - source_file (str): Path of the .npy source file with its .json sidecar.
+        """
+        self.packets, metadata = load_source(source_file)
+        num_packets, self.channels, self.samples_per_packet = self.packets.shape
+        self.sampling_rate = metadata['sampling_rate']
+        self.length = num_packets * self.samples_per_packet
+
+    def __len__(self):
+        return self.length
+
+    def view(self, start=None, stop=None, channels=slice(None)):
+        """
+        Get a range of samples, copied out of the packets it spans.
+
+        Parameters:
+        - start (int): First sample index, defaults to the beginning.
+        - stop (int): Sample index after the last sample, defaults to the end.
+        - channels (slice): Channel selection.
+
+        Returns:
+        - np.ndarray: Samples of shape (channels, samples).
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        stop = max(start, stop)
+        first_packet = start // self.samples_per_packet
+        last_packet = -(-stop // self.samples_per_packet)
+        packets = self.packets[first_packet:last_packet, channels]
+        data = packets.transpose(1, 0, 2).reshape(packets.shape[1], -1)
+        offset = first_packet * self.samples_per_packet
+        return data[:, start - offset:stop - offset]
+
+
+def open_recording(path):
+    """
+    Open a session file or source file read-only.
+
+    Parameters:
+    - path (str): `.emgrec` session file or `.npy` source file.
+
+    Returns:
+    - MemmapRecordingStore | SourceRecording: Recording with channels,
+      sampling_rate, len() and view(start, stop, channels).
+    """
+    if path.endswith(MemmapRecordingStore.FILE_EXTENSION):
+        return MemmapRecordingStore.open(path)
+    return SourceRecording(path)
+
+
+# Recordings opened by the current worker process, keyed by path
+_open_recordings = {}
+
+
+def _recording(path):
+    recording = _open_recordings.get(path)
+    if recording is None:
+        recording = _open_recordings[path] = open_recording(path)
+    return recording
+
+
+def process_task(task):
+    """
+    Process one task and write it into the output file, runs in a worker process.
+
+    Parameters:
+    - task (BatchTask): Input, output, mode and the part of the recording.
+
+    Returns:
+    - int: Number of samples processed, summed over channels.
+    """
+    recording = _recording(task.input_path)
+    output = np.load(task.output_path, mmap_mode='r+')
+    channels = slice(task.first_channel, task.last_channel)
+    num_samples = len(recording)
+
+    if task.mode == 'filter':
+        sos = design_filter(task.parameters['filter_order'], task.parameters['filter_band'],
+                            recording.sampling_rate)
+        padlen = filtfilt_padlen(sos)
+        if num_samples <= padlen:
+            raise ValueError(f"The recording is too short for the filter ({padlen + 1} samples needed)")
+
+    def read(start, stop):
+        return recording.view(start, stop, channels)
+
+    for start in range(task.start, task.stop, CHUNK_SAMPLES):
+        stop = min(start + CHUNK_SAMPLES, task.stop)
+        output[channels, start:stop] = process_range(
+            read, num_samples, start, stop, task.mode, recording.sampling_rate, **task.parameters
+        )
+
+    output.flush()
+    return (task.last_channel - task.first_channel) * (task.stop - task.start)
+
+
+def make_parameters(rms_window_size=20, filter_order=4, filter_band=(20, 450)):
+    """
+    Processing parameters of all modes, with the defaults of the recording view.
+
+    Returns:
+    - dict: Parameters passed to every task.
+    """
+    return {
+        'rms_window_size': rms_window_size,
+        'filter_order': filter_order,
+        'filter_band': tuple(filter_band),
+    }
+
+
+def plan_tasks(input_path, output_path, mode, parameters, num_channels, num_samples, sampling_rate,
+               split='time', block_samples=120000, channels_per_task=1):
+    """
+    Split the processing of one recording and mode into tasks.
+
+    Parameters:
+    - input_path (str): Session or source file.
+    - output_path (str): Output .npy file.
+    - mode (str): 'raw', 'rms', 'envelope', or 'filter'.
+    - parameters (dict): Processing parameters, see make_parameters.
+    - num_channels (int): Number of channels of the recording.
+    - num_samples (int): Number of samples of the recording.
+    - sampling_rate (float): Sampling rate in Hz.
+    - split (str): 'time' for blocks of all channels, 'channel' for channel groups.
+    - block_samples (int): Samples per time block.
+    - channels_per_task (int): Channels per group.
+
+    Returns:
+    - list: BatchTask entries covering the recording.
+    """
+    if split == 'channel':
+        return [
+            BatchTask(input_path, output_path, mode, parameters, first, min(first + channels_per_task, num_channels),
+                      0, num_samples)
+            for first in range(0, num_channels, channels_per_task)
+        ]
+    # Shorter blocks would mostly consist of overlap
+    block_samples = max(block_samples, 4 * max(block_overlap(mode, sampling_rate, **parameters)))
+    return [
+        BatchTask(input_path, output_path, mode, parameters, 0, num_channels, start,
+                  min(start + block_samples, num_samples))
+        for start in range(0, num_samples, block_samples)
+    ]
+
+
+def find_inputs(paths):
+    """
+    Collect the recordings to process.
+
+    Parameters:
+    - paths (list): Files or directories, directories are searched for
+      .emgrec, .pkl and .npy source files (with sidecar).
+
+    Returns:
+    - list: Sorted input files.
+    """
+    inputs = []
+    for path in paths:
+        if not os.path.isdir(path):
+            inputs.append(path)
+            continue
+        for pattern in ('*' + MemmapRecordingStore.FILE_EXTENSION, '*.pkl', '*.npy'):
+            for file in sorted(glob.glob(os.path.join(path, pattern))):
+                if not file.endswith('.npy') or is_source_file(file):
+                    inputs.append(file)
+    return inputs
+
+
+def is_source_file(path):
+    """
+    Check whether a .npy file is a source file, as opposed to e.g. a batch result.
+    """
+    try:
+        with open(sidecar_path(path)) as f:
+            return json.load(f).get('layout') == 'packet-major'
+    except (OSError, ValueError):
+        return False
+
+
+def output_paths(input_path, directory, modes, taken):
+    """
+    Output paths of an input, unique among the outputs planned so far.
+
+    Inputs with the same name, e.g. rec.pkl and rec.npy, or sessions from
+    different directories written to one output directory, would write
+    the same files. Later ones get a numbered suffix, e.g. rec_2_filter.npy.
+
+    Parameters:
+    - input_path (str): Input file.
+    - directory (str): Output directory.
+    - modes (tuple): Modes applied to the input.
+    - taken (set): Normalized paths of the planned outputs, extended with the returned ones.
+
+    Returns:
+    - dict: Mode -> output path.
+    """
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    stem = name
+    index = 1
+    while True:
+        paths = {mode: os.path.join(directory, f"{stem}_{mode}.npy") for mode in modes}
+        keys = {os.path.normcase(os.path.abspath(path)) for path in paths.values()}
+        if not keys & taken:
+            taken.update(keys)
+            if stem != name:
+                print(f"Writing the results of {input_path} as {stem}_<mode>.npy, {name} is taken")
+            return paths
+        index += 1
+        stem = f"{name}_{index}"
+
+
+def run_batch(paths, modes=MODES, output_dir=None, split='time', block_seconds=60, channels_per_task=1,
+              workers=None, parameters=None):
+    """
+    Process recordings with a process pool and write the results.
+
+    Parameters:
+    - paths (list): Input files or directories, see find_inputs.
+    - modes (tuple): Modes applied to every input.
+    - output_dir (str): Directory of the results, next to each input if None.
+    - split (str): 'time' or 'channel', see plan_tasks.
+    - block_seconds (float): Duration of a time block.
+    - channels_per_task (int): Channels per group when splitting by channel.
+    - workers (int): Number of worker processes, all CPU cores if None.
+    - parameters (dict): Processing parameters, see make_parameters.
+
+    Returns:
+    - tuple(list, list): Paths of the written results and descriptions of
+      the failed inputs or outputs, which are reported and skipped.
+    """
+    parameters = make_parameters() if parameters is None else parameters
+    inputs = find_inputs(paths)
+    if not inputs:
+        print("No recordings found.")
+        return [], []
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    written = []
+    failed = []
+    # Closed after the pool, once no worker uses the converted pickles any more
+    with ExitStack() as staging, ProcessPoolExecutor(max_workers=workers) as executor:
+        staging_dirs = {}  # output directory -> directory of the converted pickles
+        outputs = {}  # partial output path -> description of the output
+        taken = set()  # output paths planned so far
+        futures = {}
+        for input_index, input_path in enumerate(inputs):
+            directory = os.path.dirname(os.path.abspath(input_path)) if output_dir is None else output_dir
+            source_path = input_path
+            try:
+                if input_path.endswith('.pkl'):
+                    # Converted once, so the workers only memory-map it. Staged next to
+                    # the results, which need space of the same order anyway
+                    if directory not in staging_dirs:
+                        staging_dirs[directory] = staging.enter_context(
+                            tempfile.TemporaryDirectory(dir=directory, prefix='.batch-')
+                        )
+                    source_path = os.path.join(staging_dirs[directory], f"source_{input_index}.npy")
+                    convert_pickle(input_path, source_path, channels=None)
+                recording = open_recording(source_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping {input_path}: {e}")
+                failed.append(input_path)
+                continue
+            num_channels, num_samples = recording.channels, len(recording)
+            sampling_rate = recording.sampling_rate
+            del recording
+
+            for mode, path in output_paths(input_path, directory, modes, taken).items():
+                partial_path = path[:-len('.npy')] + '.partial.npy'
+                # Created here, the tasks write their parts into it
+                np.lib.format.open_memmap(
+                    partial_path, mode='w+', dtype=np.float32, shape=(num_channels, num_samples),
+                    fortran_order=True
+                ).flush()
+                tasks = plan_tasks(
+                    source_path, partial_path, mode, parameters, num_channels, num_samples, sampling_rate,
+                    split=split, block_samples=max(1, int(block_seconds * sampling_rate)),
+                    channels_per_task=channels_per_task
+                )
+                outputs[partial_path] = {
+                    'path': path,
+                    'input': input_path,
+                    'mode': mode,
+                    'sampling_rate': sampling_rate,
+                    'channels': num_channels,
+                    'samples': num_samples,
+                    'remaining': len(tasks),
+                    'error': None,
+                    'start_time': time.perf_counter(),
+                }
+                for task in tasks:
+                    futures[executor.submit(process_task, task)] = partial_path
+                if not tasks:
+                    finish_output(partial_path, outputs[partial_path], parameters, written, failed)
+
+        for future in as_completed(futures):
+            partial_path = futures[future]
+            output = outputs[partial_path]
+            try:
+                future.result()
+            except Exception as e:
+                output['error'] = output['error'] or e
+            output['remaining'] -= 1
+            if output['remaining'] == 0:
+                finish_output(partial_path, output, parameters, written, failed)
+
+    print(f"{len(written)} of {len(outputs)} results written.")
+    return written, failed
+
+
+def finish_output(partial_path, output, parameters, written, failed):
+    """
+    Move a completed output into place and write its sidecar, or remove a failed one.
+    """
+    if output['error'] is not None:
+        os.remove(partial_path)
+        print(f"Failed {output['input']} ({output['mode']}): {output['error']}")
+        failed.append(f"{output['input']} ({output['mode']})")
+        return
+
+    os.replace(partial_path, output['path'])
+    with open(os.path.splitext(output['path'])[0] + '.json', 'w') as f:
+        json.dump({
+            'dtype': 'float32',
+            'layout': 'channels x samples, Fortran order',
+            'source': os.path.abspath(output['input']),
+            'mode': output['mode'],
+            'sampling_rate': output['sampling_rate'],
+            'channels': output['channels'],
+            'samples': output['samples'],
+            'parameters': parameters,
+        }, f, indent=2)
+    written.append(output['path'])
+    seconds = time.perf_counter() - output['start_time']
+    print(f"Wrote {output['path']} ({output['samples'] / output['sampling_rate']:.1f} s of "
+          f"{output['channels']} channels) after {seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process EMG recordings in parallel without the GUI")
+    parser.add_argument('inputs', nargs='+',
+                        help="Session files (.emgrec), pickled recordings (.pkl), source files (.npy) or directories")
+    parser.add_argument('--mode', nargs='+', choices=MODES, default=list(MODES), help="Processing modes to apply")
+    parser.add_argument('--output-dir', default=None, help="Directory of the results, defaults to next to each input")
+    parser.add_argument('--split', choices=('time', 'channel'), default='time',
+                        help="Split the work into time blocks of all channels or into channel groups")
+    parser.add_argument('--block-seconds', type=float, default=60, help="Duration of a time block")
+    parser.add_argument('--channels-per-task', type=int, default=1, help="Channels per group for --split channel")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes, defaults to all CPU cores")
+    parser.add_argument('--rms-window', type=int, default=20, help="RMS window in samples")
+    parser.add_argument('--filter-order', type=int, default=4, help="Order of the Butterworth band-pass")
+    parser.add_argument('--filter-band', type=float, nargs=2, default=(20, 450), help="Pass band in Hz")
+    args = parser.parse_args()
+
+    written, failed = run_batch(
+        args.inputs, modes=args.mode, output_dir=args.output_dir, split=args.split,
+        block_seconds=args.block_seconds, channels_per_task=args.channels_per_task, workers=args.workers,
+        parameters=make_parameters(args.rms_window, args.filter_order, args.filter_band)
+    )
+    raise SystemExit(1 if failed or not written else 0)
@@ -0,0 +1,208 @@
+from service.recording_store import RecordingStore
+import threading
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    Multi-level min/max summary of a growing recording, for plotting.
+
+    Level 0 stores the minimum and maximum of every `base_bin` samples,
+    every further level merges `factor` bins of the level below. The
+    pyramid is an index over a source store: `update` summarizes only the
+    samples appended since the previous call, so building it costs O(packet)
+    per packet. `query` returns about `max_points` values for any sample
+    range, independent of the recording length, and keeps every peak
+    visible because each bin contributes its minimum and its maximum.
+
+    `update`, `clear` and `truncate` may run on another thread than `query`
+    (e.g. ingest on the client thread, queries on a processing worker).
+    They hold a lock while changing the levels; `query` takes a snapshot
+    of the levels and their lengths under the lock and works from that.
+    """
+
+    def __init__(self, source, base_bin=64, factor=4):
+        """
+        Initialize an empty pyramid over a source store.
+
+        Parameters:
+        - source (RecordingStore | MemmapRecordingStore): Samples to summarize.
+        - base_bin (int): Number of samples per bin on level 0.
+        - factor (int): Number of bins merged into one bin on the next level.
+        """
+        self.source = source
+        self.base_bin = base_bin
+        self.factor = factor
+        self.channels = source.channels
+        self.levels = []  # list of (mins, maxs) RecordingStores
+        self.generation = source.generation
+        self.lock = threading.Lock()
+
+    def bin_size(self, level):
+        """
+        Number of samples summarized by one bin of a level.
+        """
+        return self.base_bin * self.factor ** level
+
+    def clear(self):
+        """
+        Drop all levels.
+        """
+        with self.lock:
+            self.levels = []
+
+    def truncate(self, length):
+        """
+        Drop all bins that cover samples from the given index on.
+        Used when the end of the source is rewritten.
+
+        Parameters:
+        - length (int): Number of source samples that are unchanged.
+        """
+        with self.lock:
+            for level, (mins, maxs) in enumerate(self.levels):
+                num_bins = length // self.bin_size(level)
+                mins.truncate(num_bins)
+                maxs.truncate(num_bins)
+
+    def update(self):
+        """
+        Summarize the samples appended to the source since the previous update.
+        """
+        with self.lock:
+            if self.generation != self.source.generation:
+                self.levels = []
+                self.generation = self.source.generation
+
+            # Level 0 from complete bins of new source samples
+            if not self.levels:
+                self._add_level()
+            mins, maxs = self.levels[0]
+            first = len(mins) * self.base_bin
+            last = len(self.source) // self.base_bin * self.base_bin
+            block = self.source.view(first, last) if last > first else None
+            # Shorter if the source was cleared meanwhile, the next update starts over
+            if block is not None and block.shape[-1] == last - first:
+                bins = block.reshape(self.channels, -1, self.base_bin)
+                mins.append(bins.min(axis=-1))
+                maxs.append(bins.max(axis=-1))
+
+            # Higher levels from complete groups of bins of the level below
+            level = 0
+            while True:
+                lower_mins, lower_maxs = self.levels[level]
+                if level + 1 == len(self.levels):
+                    if len(lower_mins) < 2 * self.factor:
+                        break
+                    self._add_level()
+                mins, maxs = self.levels[level + 1]
+                first = len(mins) * self.factor
+                last = len(lower_mins) // self.factor * self.factor
+                if last > first:
+                    mins.append(lower_mins.view(first, last).reshape(self.channels, -1, self.factor).min(axis=-1))
+                    maxs.append(lower_maxs.view(first, last).reshape(self.channels, -1, self.factor).max(axis=-1))
+                level += 1
+
+    def _add_level(self):
+        """
+        Append an empty level on top of the pyramid.
+        """
+        self.levels.append((
+            RecordingStore(channels=self.channels, initial_capacity=1024, dtype=self.source.dtype),
+            RecordingStore(channels=self.channels, initial_capacity=1024, dtype=self.source.dtype),
+        ))
+
+    def query(self, start, stop, max_points, channel=0):
+        """
+        Get a peak-preserving summary of a sample range of one channel.
+
+        Parameters:
+        - start (int): First sample index.
+        - stop (int): Sample index after the last sample.
+        - max_points (int): Approximate number of points to return.
+        - channel (int): Channel index in the source.
+
+        Returns:
+        - tuple(np.ndarray, np.ndarray): Sample positions (float) and values.
+          Ranges short enough are returned unchanged, otherwise every bin
+          contributes its minimum and maximum at the bin center.
+        """
+        start = max(0, start)
+        stop = min(stop, len(self.source))
+        if stop <= start:
+            return np.zeros(0), np.zeros(0, dtype=self.source.dtype)
+        if stop - start <= max_points:
+            return self._query_source(start, stop, channel)
+
+        # Levels and the number of bins complete on both of their stores,
+        # an update on another thread only appends beyond these
+        with self.lock:
+            levels = [(mins, maxs, min(len(mins), len(maxs))) for mins, maxs in self.levels]
+
+        # Coarsest level still resolving the range into max_points / 2 bins,
+        # its bins are then merged down to about that number
+        bins_wanted = max(1, max_points // 2)
+        if not levels or (stop - start) / self.base_bin < bins_wanted:
+            data = self.source.view(start, stop, channels=channel)
+            return _merge_bins(data, data, start, 1, bins_wanted)
+        level = 0
+        while level + 1 < len(levels) and (stop - start) / self.bin_size(level + 1) >= bins_wanted:
+            level += 1
+        return self._query_level(levels, start, stop, level, channel, bins_wanted)
+
+    def _query_source(self, start, stop, channel):
+        """
+        Unsummarized samples of a range, positioned by the samples actually
+        returned in case the source was cleared meanwhile.
+        """
+        values = self.source.view(start, stop, channels=channel)
+        return np.arange(start, start + len(values), dtype=np.float64), values
+
+    def _query_level(self, levels, start, stop, level, channel, bins_wanted):
+        """
+        Summary of a range from one level of a snapshot of the levels, with
+        the partial bins at both ends of the range taken from finer levels.
+        """
+        if level < 0:
+            return self._query_source(start, stop, channel)
+        size = self.bin_size(level)
+        mins, maxs, num_bins = levels[level]
+        first = -(-start // size)
+        last = min(stop // size, num_bins)
+        if first >= last:
+            return self._query_level(levels, start, stop, level - 1, channel, bins_wanted)
+
+        head = self._query_level(levels, start, first * size, level - 1, channel, bins_wanted)
+        tail = self._query_level(levels, last * size, stop, level - 1, channel, bins_wanted)
+        positions, values = _merge_bins(
+            mins.view(first, last, channels=channel),
+            maxs.view(first, last, channels=channel),
+            first * size, size, bins_wanted
+        )
+        return (np.concatenate((head[0], positions, tail[0])),
+                np.concatenate((head[1], values, tail[1])))
+
+
+def _merge_bins(mins, maxs, start, size, num_bins):
+    """
+    Merge consecutive min/max bins into about num_bins bins.
+
+    Parameters:
+    - mins (np.ndarray): 1D minima of consecutive bins.
+    - maxs (np.ndarray): 1D maxima of consecutive bins.
+    - start (int): Sample position of the first bin.
+    - size (int): Number of samples per input bin.
+    - num_bins (int): Number of output bins wanted.
+
+    Returns:
+    - tuple(np.ndarray, np.ndarray): Positions and interleaved minimum and
+      maximum of each output bin, both at the bin center.
+    """
+    group = -(-len(mins) // num_bins)
+    starts = np.arange(0, len(mins), group)
+    lengths = np.minimum(group, len(mins) - starts)
+    centers = start + (starts + 0.5 * lengths) * size
+    values = np.empty(2 * len(starts), dtype=mins.dtype)
+    values[0::2] = np.minimum.reduceat(mins, starts)
+    values[1::2] = np.maximum.reduceat(maxs, starts)
+    return np.repeat(centers, 2), values
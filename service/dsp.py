@@ -0,0 +1,593 @@
+from collections import OrderedDict
+from functools import lru_cache
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt, remez, fftconvolve, hilbert
+from service.live_buffer import LiveSignalBuffer
+from service.recording_store import RecordingStore
+from service.decimation import MinMaxPyramid
+import numpy as np
+
+
+@lru_cache(maxsize=32)
+def _design_filter_cached(order, band, sampling_rate, btype):
+    return butter(order, band, btype=btype, fs=sampling_rate, output='sos')
+
+
+def design_filter(order, band, sampling_rate, btype='bandpass'):
+    """
+    Design a Butterworth filter in second-order sections, with caching.
+
+    Designs are kept in an LRU cache keyed by (order, band, sampling_rate, btype),
+    so every processing path shares the coefficients and switching modes or
+    channels never re-designs a filter. The least recently used designs are
+    evicted once the cache is full.
+
+    Parameters:
+    - order (int): Filter order.
+    - band (float | tuple): Cutoff frequency, or lower and upper cutoff, in Hz.
+    - sampling_rate (float): Sampling rate in Hz.
+    - btype (str): 'bandpass', 'lowpass', 'highpass' or 'bandstop'.
+
+    Returns:
+    - np.ndarray: SOS coefficients of shape (n_sections, 6). The array is
+      shared between all callers and must not be modified.
+    """
+    if np.ndim(band) > 0:
+        band = tuple(float(f) for f in band)
+    else:
+        band = float(band)
+    return _design_filter_cached(int(order), band, float(sampling_rate), btype)
+
+
+def moving_rms(data, window_size):
+    """
+    Centered moving RMS along the sample axis.
+
+    Uses the same window alignment as np.convolve(..., 'same') with a
+    window of `window_size` ones, computed from a cumulative sum so the
+    cost does not depend on the window size.
+
+    Parameters:
+    - data (np.ndarray): Signal of shape (..., samples).
+    - window_size (int): Number of samples in the RMS window.
+
+    Returns:
+    - np.ndarray: RMS values of the same shape.
+    """
+    num_samples = data.shape[-1]
+    cumulative = np.zeros(data.shape[:-1] + (num_samples + 1,), dtype=np.float64)
+    np.cumsum(np.square(data, dtype=np.float64), axis=-1, out=cumulative[..., 1:])
+    index = np.arange(num_samples)
+    upper = np.minimum(index + (window_size - 1) // 2 + 1, num_samples)
+    lower = np.maximum(index - window_size // 2, 0)
+    window_sums = cumulative[..., upper] - cumulative[..., lower]
+    return np.sqrt(np.maximum(window_sums, 0) / window_size)
+
+
+def process_block(data, mode, sampling_rate, rms_window_size=20, filter_order=4, filter_band=(20, 450)):
+    """
+    Apply a processing mode to all channels of a signal block at once.
+
+    Parameters:
+    - data (np.ndarray): Signal of shape (channels, samples), or any
+      shape with samples on the last axis.
+    - mode (str): 'raw', 'rms', 'envelope', or 'filter'.
+    - sampling_rate (float): Sampling rate in Hz.
+    - rms_window_size (int): Number of samples in the RMS window.
+    - filter_order (int): Order of the Butterworth band-pass.
+    - filter_band (tuple): Pass band of the filter in Hz.
+
+    Returns:
+    - np.ndarray: Processed signal of the same shape.
+    """
+    if mode == 'rms':
+        return moving_rms(data, rms_window_size)
+    elif mode == 'envelope':
+        return np.abs(hilbert(data, axis=-1))
+    elif mode == 'filter':
+        sos = design_filter(filter_order, filter_band, sampling_rate)
+        return sosfiltfilt(sos, data, axis=-1)
+    return data
+
+
+def impulse_response_length(sos, tolerance=1e-6, max_samples=100000):
+    """
+    Number of samples until the impulse response of a filter has decayed.
+
+    Parameters:
+    - sos (np.ndarray): SOS coefficients.
+    - tolerance (float): Threshold relative to the peak of the impulse response.
+    - max_samples (int): Upper bound for slowly decaying filters.
+
+    Returns:
+    - int: Index of the last sample above the threshold, plus one.
+    """
+    impulse = np.zeros(max_samples)
+    impulse[0] = 1
+    response = np.abs(sosfilt(sos, impulse))
+    return int(np.nonzero(response > tolerance * response.max())[0][-1]) + 1
+
+
+def filtfilt_padlen(sos):
+    """
+    Length of the odd extension scipy.signal.sosfiltfilt pads a signal with by default.
+
+    Parameters:
+    - sos (np.ndarray): SOS coefficients.
+
+    Returns:
+    - int: Number of samples padded at each end.
+    """
+    num_taps = 2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    return int(3 * num_taps)
+
+
+ENVELOPE_OVERLAP_SECONDS = 1.0
+
+
+@lru_cache(maxsize=32)
+def _filter_overlap(order, band, sampling_rate):
+    sos = design_filter(order, band, sampling_rate)
+    return max(impulse_response_length(sos), filtfilt_padlen(sos) + 1)
+
+
+def block_overlap(mode, sampling_rate, rms_window_size=20, filter_order=4, filter_band=(20, 450)):
+    """
+    Number of neighbouring samples process_block needs on both sides of a block
+    to give the result of processing the whole signal.
+
+    - 'rms': the samples in the centered window, the result is exact.
+    - 'envelope': ENVELOPE_OVERLAP_SECONDS of signal. The Hilbert transform
+      depends on the whole signal, but the influence of distant samples
+      decays. At 2 kHz, processing in blocks of 1000 to 65536 samples gives a
+      relative RMS error of ~0.02 % on band-pass (20-450 Hz) EMG and 0.1 to
+      0.6 % on the broadband example recording, whose content reaches down
+      to 0 Hz.
+    - 'filter': the length of the impulse response, until it decayed below
+      1e-6 of its peak.
+
+    Parameters:
+    - mode (str): 'raw', 'rms', 'envelope', or 'filter'.
+    - sampling_rate (float): Sampling rate in Hz.
+    - rms_window_size (int): Number of samples in the RMS window.
+    - filter_order (int): Order of the Butterworth band-pass.
+    - filter_band (tuple): Pass band of the filter in Hz.
+
+    Returns:
+    - tuple(int, int): Samples needed before and after a block.
+    """
+    if mode == 'rms':
+        return rms_window_size // 2, (rms_window_size - 1) // 2
+    elif mode == 'envelope':
+        overlap = int(round(ENVELOPE_OVERLAP_SECONDS * sampling_rate))
+        return overlap, overlap
+    elif mode == 'filter':
+        overlap = _filter_overlap(int(filter_order), tuple(float(f) for f in filter_band), float(sampling_rate))
+        return overlap, overlap
+    return 0, 0
+
+
+def process_range(read, num_samples, start, stop, mode, sampling_rate, rms_window_size=20,
+                  filter_order=4, filter_band=(20, 450)):
+    """
+    Apply process_block to a range of samples of a longer signal.
+
+    Reads the range together with the overlap block_overlap asks for on both
+    sides, clipped to the signal, and keeps the result for the range. At the
+    ends of the signal process_block pads as it does for the whole signal,
+    so processing a signal range by range gives process_block over the whole
+    signal, within the accuracy given by block_overlap.
+
+    Parameters:
+    - read (callable): read(start, stop) returns the samples start ... stop - 1
+      of the signal as an array of shape (channels, samples).
+    - num_samples (int): Length of the signal.
+    - start (int): First sample of the range.
+    - stop (int): End of the range (exclusive).
+    - mode, sampling_rate, rms_window_size, filter_order, filter_band:
+      Processing mode and parameters, see process_block.
+
+    Returns:
+    - np.ndarray: Processed range of shape (channels, stop - start).
+    """
+    before, after = block_overlap(mode, sampling_rate, rms_window_size, filter_order, filter_band)
+    read_start = max(0, start - before)
+    read_stop = min(num_samples, stop + after)
+    if mode == 'envelope' and stop - start + before + after < num_samples:
+        # The FFT treats the whole signal as periodic: the overlap wraps around its ends
+        pieces = [read(read_start, read_stop)]
+        if start - before < 0:
+            pieces.insert(0, read(num_samples + start - before, num_samples))
+        if stop + after > num_samples:
+            pieces.append(read(0, stop + after - num_samples))
+        data, read_start = np.concatenate(pieces, axis=-1), start - before
+    else:
+        data = read(read_start, read_stop)
+    data = process_block(
+        data, mode, sampling_rate, rms_window_size=rms_window_size,
+        filter_order=filter_order, filter_band=filter_band
+    )
+    return data[:, start - read_start:stop - read_start]
+
+
+class StreamingFilter:
+    """
+    Causal IIR filter for block-wise processing of multi-channel signals.
+
+    Keeps the SOS filter state of every channel between calls, so each
+    block only costs O(block) and the concatenated output equals filtering
+    the whole signal at once.
+    """
+
+    def __init__(self, sos, channels=32):
+        """
+        Initialize the streaming filter.
+
+        Parameters:
+        - sos (np.ndarray): SOS coefficients of shape (n_sections, 6).
+        - channels (int): Number of channels processed in parallel.
+        """
+        self.sos = sos
+        self.channels = channels
+        self.zi = None
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the filter state. The next block starts a new stream.
+        """
+        self.zi = None
+
+    def process(self, block):
+        """
+        Filter the next block of samples.
+
+        Parameters:
+        - block (np.ndarray): Signal block of shape (channels, samples).
+
+        Returns:
+        - np.ndarray: Filtered block of the same shape.
+        """
+        if block.shape[-1] == 0:
+            return np.zeros(block.shape, dtype=np.float64)
+        if self.zi is None:
+            # Start in steady state for the first sample to avoid a step response
+            self.zi = sosfilt_zi(self.sos)[:, np.newaxis, :] * block[np.newaxis, :, :1]
+        filtered, self.zi = sosfilt(self.sos, block, axis=-1, zi=self.zi)
+        return filtered
+
+
+class RunningRMS:
+    """
+    Sliding-window RMS for block-wise processing of multi-channel signals.
+
+    The squared samples of the last (window - 1) samples of every channel
+    are carried over between calls, so each block only costs
+    O(block + window). The window is trailing (causal): output sample i
+    is the RMS of input samples i - window + 1 ... i, which lags the
+    centered moving_rms by window / 2 samples.
+    """
+
+    def __init__(self, window_size, channels=32):
+        """
+        Initialize the running RMS.
+
+        Parameters:
+        - window_size (int): Number of samples in the RMS window.
+        - channels (int): Number of channels processed in parallel.
+        """
+        self.window_size = window_size
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the carried samples, the next block starts after silence.
+        """
+        self.tail = np.zeros((self.channels, self.window_size - 1), dtype=np.float64)
+
+    def process(self, block):
+        """
+        Compute the running RMS of the next block of samples.
+
+        Parameters:
+        - block (np.ndarray): Signal block of shape (channels, samples).
+
+        Returns:
+        - np.ndarray: RMS values of the same shape.
+        """
+        squared = np.concatenate((self.tail, np.square(block, dtype=np.float64)), axis=-1)
+        # Window sums as differences of the cumulative sum over tail + block
+        cumulative = np.zeros((squared.shape[0], squared.shape[1] + 1), dtype=np.float64)
+        np.cumsum(squared, axis=-1, out=cumulative[:, 1:])
+        window_sums = cumulative[:, self.window_size:] - cumulative[:, :-self.window_size]
+        self.tail = squared[:, squared.shape[1] - (self.window_size - 1):]
+        return np.sqrt(np.maximum(window_sums, 0) / self.window_size)
+
+
+class StreamingEnvelope:
+    """
+    Block-wise signal envelope for multi-channel signals.
+
+    Two estimators are available, both carry their state between blocks so
+    each block costs O(block) and only new output is computed:
+
+    - 'hilbert': FIR Hilbert transformer applied by overlap-save. The last
+      (num_taps - 1) input samples are kept as history, every block is
+      convolved together with that history and only the valid part is
+      kept. The envelope is |x + j * H{x}| with x delayed to match the FIR.
+    - 'rectify': full-wave rectification followed by a stateful Butterworth
+      low-pass, scaled by pi / 2 so a sinusoid yields its amplitude.
+
+    The output is causal: process() returns the envelope of the sample
+    `delay` samples before the newest one ('hilbert'), the latency in the
+    table below. The errors in the table are for that output shifted back by
+    the latency; unshifted, the 'hilbert' output deviates from the reference
+    by ~65 %. This is meant for the live view, paths that have the whole
+    signal use process_block (see BlockRecordingStream and process_range).
+
+    Latency and accuracy against np.abs(scipy.signal.hilbert(x)) over the
+    whole signal, measured at 2 kHz on 20 s of band-pass (20-450 Hz) noise
+    with a slow amplitude modulation (relative RMS error after shifting by
+    the latency, start-up excluded):
+
+    | Method                              | Latency | Error                        |
+    |-------------------------------------|---------|------------------------------|
+    | hilbert, 31 taps, 40 Hz transition  | 7.5 ms  | 3.7 %                        |
+    | hilbert, 63 taps, 20 Hz transition  | 15.5 ms | 2.5 %                        |
+    | hilbert, 101 taps, 20 Hz (default)  | 25 ms   | 0.7 %                        |
+    | hilbert, 201 taps, 10 Hz transition | 50 ms   | 0.6 %                        |
+    | rectify, 2nd order 10 Hz low-pass   | ~23 ms  | 1.7 % vs. smoothed reference |
+
+    The FIR error is dominated by signal content below the transition
+    width, which a Hilbert FIR cannot pass. The rectified estimate is a
+    smoothed envelope; against the unsmoothed reference it deviates by
+    ~47 % because the instantaneous ripple is removed on purpose.
+    """
+
+    def __init__(self, sampling_rate, channels=32, method='hilbert',
+                 num_taps=101, transition_width=20.0, cutoff=10.0):
+        """
+        Initialize the streaming envelope.
+
+        Parameters:
+        - sampling_rate (float): Sampling rate in Hz.
+        - channels (int): Number of channels processed in parallel.
+        - method (str): 'hilbert' or 'rectify'.
+        - num_taps (int): Odd length of the Hilbert FIR ('hilbert').
+        - transition_width (float): Transition band in Hz at both band edges ('hilbert').
+        - cutoff (float): Low-pass cutoff in Hz ('rectify').
+        """
+        self.channels = channels
+        self.method = method
+        if method == 'hilbert':
+            if num_taps % 2 == 0:
+                raise ValueError("num_taps must be odd for a Hilbert FIR")
+            self.taps = remez(
+                num_taps, [transition_width, sampling_rate / 2 - transition_width], [1],
+                type='hilbert', fs=sampling_rate
+            )
+            self.delay = (num_taps - 1) // 2  # samples
+        elif method == 'rectify':
+            self.lowpass = StreamingFilter(
+                design_filter(2, cutoff, sampling_rate, btype='lowpass'),
+                channels=channels
+            )
+        else:
+            raise ValueError(f"Unknown envelope method '{method}'")
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the carried state, the next block starts after silence.
+        """
+        if self.method == 'hilbert':
+            self.history = np.zeros((self.channels, len(self.taps) - 1), dtype=np.float64)
+        else:
+            self.lowpass.reset()
+
+    def process(self, block):
+        """
+        Compute the envelope of the next block of samples.
+
+        Parameters:
+        - block (np.ndarray): Signal block of shape (channels, samples).
+
+        Returns:
+        - np.ndarray: Envelope of the same shape.
+        """
+        if self.method == 'rectify':
+            return self.lowpass.process(np.abs(block)) * (np.pi / 2)
+
+        num_samples = block.shape[-1]
+        extended = np.concatenate((self.history, block), axis=-1)
+        self.history = extended[:, num_samples:]
+        if num_samples == 0:
+            return np.zeros(block.shape, dtype=np.float64)
+        # Overlap-save: only the fully overlapping part of the convolution is kept
+        imaginary = fftconvolve(extended, self.taps[np.newaxis, :], mode='valid', axes=-1)
+        real = extended[:, self.delay:self.delay + num_samples]
+        return np.hypot(real, imaginary)
+
+
+class LiveStream:
+    """
+    Applies a streaming processor to the samples arriving in a LiveSignalBuffer.
+
+    Only samples written since the previous update are processed. Results
+    are written into an output ring buffer of the same size as the source.
+    If the consumer falls behind by more than one window, the processor is
+    reset and restarted on the latest window.
+    """
+
+    def __init__(self, source, processor):
+        """
+        Initialize the live stream.
+
+        Parameters:
+        - source (LiveSignalBuffer): Buffer with the incoming signal.
+        - processor: Object with process(block) and reset() methods.
+        """
+        self.source = source
+        self.processor = processor
+        channels = source.buffer.shape[0]
+        self.output = LiveSignalBuffer(channels=channels, window_samples=source.window_samples)
+        self.position = None
+
+    def update(self):
+        """
+        Process newly arrived samples.
+
+        Returns:
+        - LiveSignalBuffer: Output buffer with the processed window.
+        """
+        data, position = self.source.read_since(self.position)
+        if self.position is None or position - self.position != data.shape[-1]:
+            # First update or samples were missed: restart on the whole window
+            self.processor.reset()
+        if data.shape[-1] > 0:
+            self.output.update(self.processor.process(data).astype(np.float32))
+        self.position = position
+        return self.output
+
+
+class BlockRecordingStream:
+    """
+    Applies process_block to a growing recording.
+
+    Keeps a processed copy of the recording for a selection of channels that
+    equals process_block over the samples recorded so far (see process_range).
+    The result for the last samples depends on samples that are not recorded
+    yet, so with every update the output is redone from the first sample
+    whose look-ahead (block_overlap) was incomplete; older output is kept.
+    Each update therefore costs O(new samples + overlap) instead of
+    O(recording). A cleared recording (new generation) restarts the stream.
+
+    For 'envelope' the first ENVELOPE_OVERLAP_SECONDS are an exception: the
+    FFT over the whole recording wraps them around to its current end, the
+    stream keeps them as computed when their look-ahead had arrived.
+    For 'filter' the output starts once the recording is longer than the
+    padding sosfiltfilt needs; before that the processed recording is empty.
+    """
+
+    MAX_BLOCK_SAMPLES = 1 << 20  # limits temporary memory when catching up
+
+    def __init__(self, source, mode, sampling_rate, channels=slice(None), rms_window_size=20,
+                 filter_order=4, filter_band=(20, 450)):
+        """
+        Initialize the block recording stream.
+
+        Parameters:
+        - source (RecordingStore | MemmapRecordingStore): Recording to process.
+        - mode (str): 'raw', 'rms', 'envelope', or 'filter'.
+        - sampling_rate (float): Sampling rate in Hz.
+        - channels (slice | list): Channel selection, keeps the channel axis.
+        - rms_window_size, filter_order, filter_band: Processing parameters,
+          see process_block.
+        """
+        self.source = source
+        self.mode = mode
+        self.sampling_rate = sampling_rate
+        self.parameters = dict(
+            rms_window_size=rms_window_size, filter_order=filter_order, filter_band=filter_band
+        )
+        self.channels = channels
+        num_channels = source.view(0, 0, channels).shape[0]
+        self.output = RecordingStore(channels=num_channels)
+        self.pyramid = MinMaxPyramid(self.output)
+        self.look_ahead = block_overlap(mode, sampling_rate, **self.parameters)[1]
+        self.min_samples = 0
+        if mode == 'filter':
+            self.min_samples = filtfilt_padlen(design_filter(filter_order, filter_band, sampling_rate)) + 1
+        self.position = 0  # recording length at the previous update
+        self.settled = 0  # output samples that no longer change
+        self.generation = None
+
+    def read(self, start, stop):
+        return self.source.view(start, stop, channels=self.channels)
+
+    def update(self):
+        """
+        Process samples appended to the recording since the previous update.
+
+        Returns:
+        - RecordingStore: Output store with the processed recording,
+          summarized for plotting by self.pyramid.
+        """
+        if self.generation != self.source.generation:
+            self.output.clear()
+            self.position = 0
+            self.settled = 0
+            self.generation = self.source.generation
+
+        end = len(self.source)
+        if end == self.position or end < self.min_samples:
+            self.pyramid.update()
+            return self.output
+
+        self.output.truncate(self.settled)
+        self.pyramid.truncate(self.settled)
+        for start in range(self.settled, end, self.MAX_BLOCK_SAMPLES):
+            stop = min(start + self.MAX_BLOCK_SAMPLES, end)
+            self.output.append(process_range(
+                self.read, end, start, stop, self.mode, self.sampling_rate, **self.parameters
+            ))
+        self.position = end
+        self.settled = max(0, end - self.look_ahead)
+        self.pyramid.update()
+        return self.output
+
+
+class RecordingResultCache:
+    """
+    Cache of processed recording results for the recording view.
+
+    Entries are BlockRecordingStreams keyed by
+    (channel, mode, parameters) for the current recording generation. Looking
+    up an entry extends it with samples appended since its last use, so an
+    unchanged recording costs nothing and a growing one only its new samples.
+    Clearing the recording (new generation) invalidates all entries. The least
+    recently used entries are evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, source, max_entries=8):
+        """
+        Initialize the cache.
+
+        Parameters:
+        - source (RecordingStore | MemmapRecordingStore): Recording the results belong to.
+        - max_entries (int): Maximum number of cached results.
+        """
+        self.source = source
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generation = source.generation
+
+    def get(self, channel, mode, parameters, factory):
+        """
+        Get the processed result of a recording channel, up to date.
+
+        Parameters:
+        - channel (int): Channel index (0-based).
+        - mode (str): Processing mode.
+        - parameters (tuple): Hashable processing parameters of the mode.
+        - factory (callable): Creates the stream for a channel slice on a cache miss.
+
+        Returns:
+        - BlockRecordingStream: Updated stream, its output holds the
+          processed channel.
+        """
+        if self.generation != self.source.generation:
+            self.entries.clear()
+            self.generation = self.source.generation
+
+        key = (channel, mode, parameters)
+        stream = self.entries.get(key)
+        if stream is None:
+            stream = factory(slice(channel, channel + 1))
+            self.entries[key] = stream
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        stream.update()
+        return stream
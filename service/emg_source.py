@@ -0,0 +1,168 @@
+"""
+Memory-mapped source files for EMGTCPServer.
+
+A source consists of two files:
+
+- `<name>.npy`: float32 samples in packet-major order, shape
+  (packets, channels, samples_per_packet), so every packet the server
+  sends is one contiguous block of the file.
+- `<name>.json`: sidecar with the sampling rate and the shape.
+
+The server memory-maps the `.npy` file, so only the packets actually sent
+are paged in and startup time does not depend on the file size.
+
+Convert a pickled recording once with:
+
+    python -m service.emg_source recording.pkl recording.npy
+"""
+
+import argparse
+import json
+import os
+import pickle
+
+import numpy as np
+
+SOURCE_VERSION = 1
+
+
+def sidecar_path(source_file):
+    """
+    Path of the JSON sidecar belonging to a source file.
+
+    Parameters:
+    - source_file (str): Path of the .npy source file.
+
+    Returns:
+    - str: Path with the extension replaced by .json.
+    """
+    return os.path.splitext(source_file)[0] + '.json'
+
+
+def convert_pickle(pkl_file, source_file, channels=32, chunk_packets=4096):
+    """
+    Convert a pickled recording into a memory-mappable source file with sidecar.
+
+    Parameters:
+    - pkl_file (str): Pickle with 'biosignal' of shape (channels, samples, packets)
+      and 'device_information' containing 'sampling_frequency'.
+    - source_file (str): Path of the .npy file to write.
+    - channels (int): Number of leading channels to keep, all if None.
+    - chunk_packets (int): Number of packets converted at a time.
+    """
+    with open(pkl_file, 'rb') as f:
+        data = pickle.load(f)
+    biosignal = data['biosignal'][:channels]
+    sampling_rate = data['device_information']['sampling_frequency']
+    num_channels, samples_per_packet, num_packets = biosignal.shape
+
+    packets = np.lib.format.open_memmap(
+        source_file, mode='w+', dtype=np.float32,
+        shape=(num_packets, num_channels, samples_per_packet)
+    )
+    for start in range(0, num_packets, chunk_packets):
+        stop = min(start + chunk_packets, num_packets)
+        packets[start:stop] = biosignal[..., start:stop].transpose(2, 0, 1)
+    packets.flush()
+    del packets
+
+    write_sidecar(source_file, sampling_rate, (num_packets, num_channels, samples_per_packet))
+
+
+def write_source(source_file, packets, sampling_rate):
+    """
+    Write packets held in memory as a source file with sidecar, e.g. synthetic data.
+
+    Parameters:
+    - source_file (str): Path of the .npy file to write.
+    - packets (np.ndarray): Samples of shape (packets, channels, samples_per_packet).
+    - sampling_rate (float): Sampling rate in Hz.
+    """
+    np.save(source_file, np.ascontiguousarray(packets, dtype=np.float32))
+    write_sidecar(source_file, sampling_rate, packets.shape)
+
+
+def write_sidecar(source_file, sampling_rate, shape):
+    """
+    Write the JSON sidecar of a source file.
+
+    Parameters:
+    - source_file (str): Path of the .npy source file.
+    - sampling_rate (float): Sampling rate in Hz.
+    - shape (tuple): Number of packets, channels and samples per packet.
+    """
+    num_packets, num_channels, samples_per_packet = shape
+    with open(sidecar_path(source_file), 'w') as f:
+        json.dump({
+            'version': SOURCE_VERSION,
+            'sampling_rate': sampling_rate,
+            'channels': num_channels,
+            'samples_per_packet': samples_per_packet,
+            'packets': num_packets,
+            'dtype': 'float32',
+            'layout': 'packet-major',
+        }, f, indent=2)
+
+
+def load_emg_signal(pkl_file=None, source_file=None, channels=32):
+    """
+    Load the signal to stream, from a memory-mapped source file or a pickle.
+
+    Parameters:
+    - pkl_file (str): Pickled recording, used if source_file is None.
+    - source_file (str): Memory-mapped .npy source file.
+    - channels (int): Number of leading channels to keep, all if None.
+
+    Returns:
+    - tuple(np.ndarray, float): float32 packets of shape (packets, channels,
+      samples_per_packet) and the sampling rate in Hz. Every packet, and every
+      run of consecutive packets, is contiguous in memory. For a source file
+      the packets are a view of the memmap and paged in when they are read.
+    """
+    if source_file is not None:
+        packets, metadata = load_source(source_file)
+        return packets[:, :channels], metadata['sampling_rate']
+
+    with open(pkl_file, 'rb') as f:
+        data = pickle.load(f)
+    # Re-laid once into packet-major order; the copy also releases
+    # the channels beyond `channels`
+    packets = np.ascontiguousarray(data['biosignal'][:channels].transpose(2, 0, 1), dtype=np.float32)
+    return packets, data['device_information']['sampling_frequency']
+
+
+def load_source(source_file):
+    """
+    Memory-map a source file read-only.
+
+    Parameters:
+    - source_file (str): Path of the .npy source file.
+
+    Returns:
+    - tuple(np.memmap, dict): Packets of shape (packets, channels, samples_per_packet)
+      and the sidecar metadata.
+    """
+    with open(sidecar_path(source_file)) as f:
+        metadata = json.load(f)
+    if metadata.get('version') != SOURCE_VERSION:
+        raise ValueError(f"Unsupported source file version {metadata.get('version')}")
+
+    packets = np.load(source_file, mmap_mode='r')
+    expected_shape = (metadata['packets'], metadata['channels'], metadata['samples_per_packet'])
+    if packets.shape != expected_shape or packets.dtype != np.float32:
+        raise ValueError(
+            f"{source_file} holds {packets.dtype} data of shape {packets.shape}, "
+            f"sidecar describes float32 data of shape {expected_shape}"
+        )
+    return packets, metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a pickled EMG recording into a memory-mappable source file")
+    parser.add_argument('pkl_file', help="Pickled recording, e.g. service/recording.pkl")
+    parser.add_argument('source_file', help="Output .npy file, a .json sidecar is written next to it")
+    parser.add_argument('--channels', type=int, default=32, help="Number of channels to keep")
+    args = parser.parse_args()
+
+    convert_pickle(args.pkl_file, args.source_file, channels=args.channels)
+    print(f"Wrote {args.source_file} and {sidecar_path(args.source_file)}")
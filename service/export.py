@@ -0,0 +1,384 @@
+"""
+Background export of recordings, processed chunk by chunk.
+
+An ExportJob reads a snapshot of the recording (all channels or a subset)
+in chunks of samples, applies the processing mode of the recording view
+and streams every chunk to a writer, on a worker thread with progress
+reports and cancellation. Nothing is ever held in memory as a whole, and
+all formats are written sequentially in sample-major order:
+
+- `.npy`: float32 array of shape (channels, samples), stored in Fortran
+  order so the file can be appended to chunk by chunk.
+- `.npz`: uncompressed archive with the same `data` array plus
+  `sampling_rate`, `channels` (1-based) and `mode`.
+- `.f32`: raw little-endian float32 samples, interleaved per sample, with
+  a `.json` sidecar describing channels, sampling rate and length.
+- `.csv` / `.txt`: `Time` column plus one column per channel, formatted
+  a whole chunk at a time.
+
+'rms' and 'envelope' are processed like the recording view: every chunk
+goes through process_block together with the overlap it needs on both
+sides (service.dsp.process_range), so the output is aligned with the
+`Time` column: it equals the centered moving RMS and, within the accuracy
+given by block_overlap, the Hilbert envelope over the whole recording. 'filter' is zero-phase like the view: the causal forward pass is
+written to a temporary file next to the output and the backward pass then
+runs over it chunk by chunk from the end, which equals sosfiltfilt over
+the whole recording.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import zipfile
+
+import numpy as np
+from scipy.signal import sosfilt_zi
+
+from service.dsp import StreamingFilter, design_filter, filtfilt_padlen, process_range
+
+# File dialog filters of the supported formats
+EXPORT_FILTERS = (
+    "CSV Files (*.csv)",
+    "NumPy Array (*.npy)",
+    "NumPy Archive (*.npz)",
+    "Raw float32 with JSON sidecar (*.f32)",
+    "Text Files (*.txt)",
+)
+
+
+def parse_channels(text, num_channels):
+    """
+    Parse a channel selection such as 'all', '5' or '1-8, 12'.
+
+    Parameters:
+    - text (str): Comma-separated 1-based channels and ranges, or 'all'.
+    - num_channels (int): Number of channels of the recording.
+
+    Returns:
+    - list: Sorted 0-based channel indices.
+    """
+    text = text.strip().lower()
+    if text in ('', 'all'):
+        return list(range(num_channels))
+    channels = set()
+    for part in text.split(','):
+        first, _, last = part.strip().partition('-')
+        first = int(first)
+        last = int(last) if last else first
+        if not 1 <= first <= last <= num_channels:
+            raise ValueError(f"Channel range '{part.strip()}' outside 1-{num_channels}")
+        channels.update(range(first - 1, last))
+    return sorted(channels)
+
+
+class NpyWriter:
+    """
+    Writes a (channels, samples) float32 .npy file in Fortran order, chunk by chunk.
+    """
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.write_header(self.file, metadata)
+
+    @staticmethod
+    def write_header(file, metadata):
+        np.lib.format.write_array_header_1_0(file, {
+            'descr': '<f4',
+            'fortran_order': True,
+            'shape': (len(metadata['channels']), metadata['samples']),
+        })
+
+    def write(self, block):
+        """
+        Parameters:
+        - block (np.ndarray): Chunk of shape (channels, samples).
+        """
+        self.file.write(memoryview(np.ascontiguousarray(block.T, dtype='<f4')).cast('B'))
+
+    def close(self):
+        self.file.close()
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+class NpzWriter(NpyWriter):
+    """
+    Writes an uncompressed .npz archive, the data array is streamed into the archive.
+    """
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED)
+        for name, value in (('sampling_rate', np.float64(metadata['sampling_rate'])),
+                            ('channels', np.asarray(metadata['channels']) + 1),
+                            ('mode', np.str_(metadata['mode']))):
+            with self.archive.open(f'{name}.npy', 'w') as member:
+                np.lib.format.write_array(member, np.asarray(value))
+        self.file = self.archive.open('data.npy', 'w', force_zip64=True)
+        self.write_header(self.file, metadata)
+
+    def close(self):
+        self.file.close()
+        self.archive.close()
+
+    def discard(self):
+        self.file.close()
+        self.archive.close()
+        os.remove(self.path)
+
+
+class RawWriter(NpyWriter):
+    """
+    Writes raw interleaved float32 samples and a JSON sidecar.
+    """
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.sidecar = os.path.splitext(path)[0] + '.json'
+        with open(self.sidecar, 'w') as f:
+            json.dump({
+                'dtype': 'float32',
+                'byte_order': 'little',
+                'layout': 'sample-major',
+                'sampling_rate': metadata['sampling_rate'],
+                'channels': [channel + 1 for channel in metadata['channels']],
+                'samples': metadata['samples'],
+                'mode': metadata['mode'],
+            }, f, indent=2)
+        self.file = open(path, 'wb')
+
+    def discard(self):
+        NpyWriter.discard(self)
+        os.remove(self.sidecar)
+
+
+class CsvWriter(NpyWriter):
+    """
+    Writes a CSV file with a time column, one formatting call per chunk.
+    """
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.sampling_rate = metadata['sampling_rate']
+        self.position = 0
+        num_channels = len(metadata['channels'])
+        self.row_format = ','.join(['%.6f'] + ['%.9g'] * num_channels) + '\n'
+        self.file = open(path, 'w', newline='')
+        self.file.write(','.join(['Time'] + [f"Ch {channel + 1}" for channel in metadata['channels']]) + '\n')
+
+    def write(self, block):
+        num_samples = block.shape[1]
+        table = np.empty((num_samples, block.shape[0] + 1))
+        table[:, 0] = np.arange(self.position, self.position + num_samples) / self.sampling_rate
+        table[:, 1:] = block.T
+        self.file.write((self.row_format * num_samples) % tuple(table.ravel().tolist()))
+        self.position += num_samples
+
+
+WRITERS = {
+    '.npy': NpyWriter,
+    '.npz': NpzWriter,
+    '.f32': RawWriter,
+    '.csv': CsvWriter,
+    '.txt': CsvWriter,
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    """
+    Export of a recording snapshot to a file, run on a worker thread.
+
+    The snapshot covers the samples recorded when the job starts; samples
+    recorded meanwhile are not exported. Clearing the recording during the
+    export fails the job. Partially written files are removed on failure
+    and cancellation.
+    """
+
+    CSV_CHUNK_SAMPLES = 8192  # keeps the formatted text of a chunk small
+
+    def __init__(self, recording, path, sampling_rate, channels=None, mode='raw',
+                 rms_window_size=20, filter_order=4, filter_band=(20, 450),
+                 chunk_samples=1 << 16, progress=None, finished=None):
+        """
+        Parameters:
+        - recording (RecordingStore | MemmapRecordingStore): Recording to export.
+        - path (str): Output file, its extension selects the format (see WRITERS).
+        - sampling_rate (float): Sampling rate in Hz.
+        - channels (list): 0-based channels to export, all if None.
+        - mode (str): 'raw', 'rms', 'envelope', or 'filter'.
+        - rms_window_size (int): Number of samples in the RMS window.
+        - filter_order (int): Order of the Butterworth band-pass.
+        - filter_band (tuple): Pass band of the filter in Hz.
+        - chunk_samples (int): Samples per channel processed and written at a time.
+        - progress (callable): Called from the worker with the completed fraction (0 to 1).
+        - finished (callable): Called from the worker with the job when it ended.
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in WRITERS:
+            raise ValueError(f"Unsupported export format '{extension}'")
+        self.recording = recording
+        self.path = path
+        self.writer_class = WRITERS[extension]
+        self.sampling_rate = sampling_rate
+        self.channels = list(range(recording.channels)) if channels is None else list(channels)
+        self.mode = mode
+        self.rms_window_size = rms_window_size
+        self.filter_order = filter_order
+        self.filter_band = filter_band
+        self.chunk_samples = chunk_samples
+        if self.writer_class is CsvWriter:
+            self.chunk_samples = min(chunk_samples, self.CSV_CHUNK_SAMPLES)
+        self.progress = progress
+        self.finished = finished
+
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.thread = None
+        self.cancelled = False
+        self.error = None  # exception that failed the job
+        self.samples = None  # samples per channel in the snapshot
+        self.generation = None  # recording generation of the snapshot
+
+    def start(self):
+        """Run the export on a daemon worker thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Request cancellation, the worker stops after the current chunk"""
+        self.cancel_event.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait until the job ended.
+
+        Returns:
+        - bool: True if it ended within the timeout.
+        """
+        return self.done.wait(timeout)
+
+    def run(self):
+        """Export synchronously, catching errors into self.error"""
+        writer = None
+        try:
+            self.generation = self.recording.generation
+            self.samples = len(self.recording)
+            metadata = {
+                'sampling_rate': self.sampling_rate,
+                'channels': self.channels,
+                'samples': self.samples,
+                'mode': self.mode,
+            }
+            writer = self.writer_class(self.path, metadata)
+            if self.mode == 'filter':
+                self.export_zero_phase(writer)
+            else:
+                self.export_streaming(writer)
+            writer.close()
+            self.report(1.0)
+        except ExportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            if writer is not None and (self.cancelled or self.error is not None):
+                writer.discard()
+            self.done.set()
+            if self.finished is not None:
+                self.finished(self)
+
+    def chunks(self, start=0, stop=None, reverse=False):
+        """
+        Chunk boundaries over the snapshot, checking for cancellation and a cleared recording.
+        """
+        stop = self.samples if stop is None else stop
+        bounds = range(start, stop, self.chunk_samples)
+        for chunk_start in reversed(bounds) if reverse else bounds:
+            if self.cancel_event.is_set():
+                raise ExportCancelled()
+            self.check_generation()
+            yield chunk_start, min(chunk_start + self.chunk_samples, stop)
+
+    def report(self, fraction):
+        if self.progress is not None:
+            self.progress(fraction)
+
+    def check_generation(self):
+        if self.recording.generation != self.generation:
+            raise RuntimeError("The recording was cleared during the export")
+
+    def read(self, start, stop):
+        """
+        Copy a range of the snapshot.
+
+        The recording may be cleared and recorded into again while it is
+        copied, so the generation is checked again once the copy is complete.
+        """
+        block = np.array(self.recording.view(start, stop, channels=self.channels))
+        self.check_generation()
+        return block
+
+    def export_streaming(self, writer):
+        """Raw, RMS and envelope: one pass, processed and written chunk by chunk"""
+        for start, stop in self.chunks():
+            writer.write(process_range(
+                self.read, self.samples, start, stop, self.mode, self.sampling_rate,
+                rms_window_size=self.rms_window_size, filter_order=self.filter_order,
+                filter_band=self.filter_band
+            ))
+            self.report(stop / self.samples)
+
+    def export_zero_phase(self, writer):
+        """
+        Zero-phase filter in three passes over a sample-major temporary file:
+        forward filter, backward filter in place from the end, then writing.
+        """
+        sos = design_filter(self.filter_order, self.filter_band, self.sampling_rate)
+        padlen = filtfilt_padlen(sos)
+        if self.samples <= padlen:
+            raise ValueError(f"The recording is too short for the filter ({padlen + 1} samples needed)")
+        num_channels = len(self.channels)
+        total_work = 3 * self.samples
+
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(self.path))) as directory:
+            filtered = np.lib.format.open_memmap(
+                os.path.join(directory, 'filtered.npy'), mode='w+', dtype=np.float32,
+                shape=(self.samples, num_channels)
+            )
+
+            # Forward pass, started on the odd extension before the first sample
+            forward = StreamingFilter(sos, channels=num_channels)
+            first = self.read(0, padlen + 1)
+            start_pad = 2 * first[:, :1] - first[:, padlen:0:-1]
+            forward.zi = sosfilt_zi(sos)[:, np.newaxis, :] * start_pad[np.newaxis, :, :1]
+            forward.process(start_pad)
+            for start, stop in self.chunks():
+                filtered[start:stop] = forward.process(self.read(start, stop)).T
+                self.report(stop / total_work)
+
+            # Continued over the odd extension after the last sample
+            last = self.read(self.samples - padlen - 1, self.samples)
+            end_pad = 2 * last[:, -1:] - last[:, -2::-1]
+            end_pad_reversed = forward.process(end_pad)[:, ::-1]
+
+            # Backward pass from the end, replacing the forward output chunk by chunk
+            backward = StreamingFilter(sos, channels=num_channels)
+            backward.zi = sosfilt_zi(sos)[:, np.newaxis, :] * end_pad_reversed[np.newaxis, :, :1]
+            backward.process(end_pad_reversed)
+            for start, stop in self.chunks(reverse=True):
+                block = filtered[start:stop][::-1].T
+                filtered[start:stop] = backward.process(block)[:, ::-1].T
+                self.report((2 * self.samples - start) / total_work)
+
+            for start, stop in self.chunks():
+                writer.write(filtered[start:stop].T)
+                self.report((2 * self.samples + stop) / total_work)
+            del filtered
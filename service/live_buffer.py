@@ -0,0 +1,119 @@
+import numpy as np
+import threading
+import time
+
+
+class LiveSignalBuffer:
+    """
+    Circular buffer for latest live signal data
+    for visualization or further processing.
+    Stores all 32 channels. Fixed length.
+
+    Incoming packets are written at a moving write head, so the cost of
+    an update scales with the packet size instead of the window size.
+    Consumers read the window either as two zero-copy segments
+    (oldest part first) or as a contiguous copy of the latest samples.
+    """
+
+    def __init__(self, channels=32, window_samples=20000):
+        """
+        Initialize the live signal buffer.
+
+        Parameters:
+        - channels (int): Number of channels (e.g., 32 EMG electrodes).
+        - window_samples (int): Number of samples to retain in the buffer.
+          Typically calculated as (sampling_rate * window_size).
+        """
+        self.buffer = np.zeros((channels, window_samples), dtype=np.float32)
+        self.window_samples = window_samples
+        self.head = 0  # index of the next sample to be written (= oldest sample)
+        self.total_samples = 0  # number of samples written since creation
+        self.lock = threading.Lock()
+        self.t0 = time.time()
+
+    def update(self, new_data):
+        """
+        Write new incoming data at the write head.
+
+        Parameters:
+        - new_data (np.ndarray): New signal data of shape (channels, samples).
+        """
+        _, num_new_samples = new_data.shape
+        if num_new_samples >= self.window_samples:
+            # Packet covers the whole window, only its tail is kept
+            with self.lock:
+                self.buffer[:] = new_data[:, -self.window_samples:]
+                self.head = 0
+                self.total_samples += num_new_samples
+            return
+
+        with self.lock:
+            end = self.head + num_new_samples
+            if end <= self.window_samples:
+                self.buffer[:, self.head:end] = new_data
+            else:
+                split = self.window_samples - self.head
+                self.buffer[:, self.head:] = new_data[:, :split]
+                self.buffer[:, :end - self.window_samples] = new_data[:, split:]
+            self.head = end % self.window_samples
+            self.total_samples += num_new_samples
+
+    def segments(self, num_samples=None, channels=slice(None)):
+        """
+        Get the latest samples as two views into the buffer, without copying.
+
+        Parameters:
+        - num_samples (int): Number of latest samples, defaults to the whole window.
+        - channels (int | slice | list): Channel selection.
+
+        Returns:
+        - tuple(np.ndarray, np.ndarray): Older and newer segment. Concatenated
+          along the sample axis they form the requested window in time order.
+          The views are only valid until the next update.
+        """
+        if num_samples is None or num_samples > self.window_samples:
+            num_samples = self.window_samples
+        start = self.head - num_samples
+        if start >= 0:
+            return (self.buffer[channels, start:self.head],
+                    self.buffer[channels, self.head:self.head])
+        return (self.buffer[channels, start % self.window_samples:],
+                self.buffer[channels, :self.head])
+
+    def latest(self, num_samples=None, channels=slice(None)):
+        """
+        Get a contiguous copy of the latest samples in time order.
+
+        Parameters:
+        - num_samples (int): Number of latest samples, defaults to the whole window.
+        - channels (int | slice | list): Channel selection.
+
+        Returns:
+        - np.ndarray: Array of shape (channels, num_samples),
+          or (num_samples,) if a single channel index is given.
+        """
+        with self.lock:
+            older, newer = self.segments(num_samples, channels)
+            return np.concatenate((older, newer), axis=-1)
+
+    def read_since(self, position, channels=slice(None)):
+        """
+        Get the samples written after a given position, for incremental consumers.
+
+        Parameters:
+        - position (int): Value of total_samples at the previous read,
+          or None to read the whole window.
+        - channels (int | slice | list): Channel selection.
+
+        Returns:
+        - tuple(np.ndarray, int): Contiguous copy of the new samples and the
+          position to pass to the next call. If more samples arrived than the
+          window holds, only the latest window is returned.
+        """
+        with self.lock:
+            if position is None:
+                num_new_samples = self.window_samples
+            else:
+                num_new_samples = min(max(self.total_samples - position, 0), self.window_samples)
+            older, newer = self.segments(num_new_samples, channels)
+            return np.concatenate((older, newer), axis=-1), self.total_samples
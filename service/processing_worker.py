@@ -0,0 +1,117 @@
+"""
+Background processing with latest-wins scheduling.
+
+A LatestWinsWorker runs processing tasks one after another on its own
+thread. At most one task waits: submitting a new task while another one is
+waiting replaces it, so a slow task (e.g. filtering a long recording) never
+builds up a backlog and the next result always reflects the newest request.
+
+Every submission gets an increasing sequence number and carries the data
+version it was made for. Results are delivered in submission order, tagged
+with both, from the worker thread. The consumer uses the tags to drop
+results that became stale, e.g. results computed for a channel that is no
+longer selected.
+
+numpy and scipy release the GIL in their inner loops, so processing on the
+worker leaves the GUI thread free to handle input and repaints.
+"""
+
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+ProcessingResult = namedtuple('ProcessingResult', ['sequence', 'version', 'value', 'seconds'])
+
+
+class LatestWinsWorker:
+    """
+    Runs submitted tasks sequentially on a daemon thread, keeping only the newest waiting task.
+
+    Tasks of one worker never run concurrently, so they may share state that
+    is not thread-safe, e.g. incremental streams and caches.
+    """
+
+    def __init__(self, name, deliver):
+        """
+        Start the worker thread.
+
+        Parameters:
+        - name (str): Thread name, shown in error messages.
+        - deliver (callable): Called from the worker thread with a
+          ProcessingResult for every completed task.
+        """
+        self.name = name
+        self.deliver = deliver
+        self.condition = threading.Condition()
+        self.pending = None  # (sequence, version, task) waiting to run
+        self.sequence = 0
+        self.running = True
+        self.busy = False  # a task is running
+        self.completed_tasks = 0
+        self.replaced_tasks = 0  # submitted tasks replaced before they ran
+        self.failed_tasks = 0
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, version, task):
+        """
+        Schedule a task, replacing the waiting one if any.
+
+        Parameters:
+        - version: Data version the task processes, returned with the result.
+        - task (callable): Called without arguments on the worker thread,
+          its return value is delivered.
+
+        Returns:
+        - int: Sequence number of the request.
+        """
+        with self.condition:
+            self.sequence += 1
+            if self.pending is not None:
+                self.replaced_tasks += 1
+            self.pending = (self.sequence, version, task)
+            self.condition.notify()
+            return self.sequence
+
+    def idle(self):
+        """
+        Check whether no task is waiting or running.
+        """
+        with self.condition:
+            return self.pending is None and not self.busy
+
+    def stop(self):
+        """
+        Stop the worker after the running task, dropping the waiting one.
+        """
+        with self.condition:
+            self.running = False
+            self.pending = None
+            self.condition.notify()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.busy = False
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                sequence, version, task = self.pending
+                self.pending = None
+                self.busy = True
+
+            start = time.perf_counter()
+            try:
+                value = task()
+            except Exception:
+                # Keep the worker alive, the next request usually succeeds
+                # (e.g. the recording was cleared while it was processed)
+                self.failed_tasks += 1
+                print(f"Error in {self.name}:")
+                traceback.print_exc()
+                continue
+            self.completed_tasks += 1
+            self.deliver(ProcessingResult(sequence, version, value, time.perf_counter() - start))
@@ -0,0 +1,72 @@
+"""
+Wire format shared by EMGTCPServer and EMGTCPClient.
+
+Version 1 sends the bare float32 payload of each packet.
+Version 2 prefixes every frame with a fixed-size little-endian header:
+
+| Field        | Type    | Description                                 |
+|--------------|---------|---------------------------------------------|
+| magic        | 2 bytes | b'EM'                                       |
+| version      | uint8   | Protocol version (2)                        |
+| flags        | uint8   | Reserved, 0                                 |
+| channels     | uint16  | Number of channels                          |
+| samples      | uint16  | Samples per channel and packet              |
+| packet_count | uint16  | Number of packets in the payload            |
+| reserved     | uint16  | Reserved, 0                                 |
+| sequence     | uint64  | Sequence number of the first packet         |
+| timestamp    | float64 | Sender time (time.time()) at send           |
+
+The payload follows the header: packet_count packets of
+(channels, samples) float32 values, packet after packet.
+"""
+
+import struct
+from collections import namedtuple
+
+MAGIC = b'EM'
+PROTOCOL_VERSION = 2
+HEADER_STRUCT = struct.Struct('<2sBBHHHHQd')
+HEADER_SIZE = HEADER_STRUCT.size
+
+PacketHeader = namedtuple(
+    'PacketHeader',
+    ['version', 'channels', 'samples', 'packet_count', 'sequence', 'timestamp']
+)
+
+
+def pack_header(sequence, timestamp, channels, samples, packet_count=1):
+    """
+    Build the header of a version 2 frame.
+
+    Parameters:
+    - sequence (int): Sequence number of the first packet in the frame.
+    - timestamp (float): Sender timestamp in seconds.
+    - channels (int): Number of channels.
+    - samples (int): Samples per channel and packet.
+    - packet_count (int): Number of packets in the payload.
+
+    Returns:
+    - bytes: Encoded header of HEADER_SIZE bytes.
+    """
+    return HEADER_STRUCT.pack(
+        MAGIC, PROTOCOL_VERSION, 0, channels, samples, packet_count, 0, sequence, timestamp
+    )
+
+
+def unpack_header(buffer):
+    """
+    Decode and validate the header of a version 2 frame.
+
+    Parameters:
+    - buffer (bytes-like): At least HEADER_SIZE bytes.
+
+    Returns:
+    - PacketHeader: Decoded header fields.
+    """
+    magic, version, _, channels, samples, packet_count, _, sequence, timestamp = \
+        HEADER_STRUCT.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f"Invalid packet header magic {magic!r}")
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {version}")
+    return PacketHeader(version, channels, samples, packet_count, sequence, timestamp)
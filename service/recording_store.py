@@ -0,0 +1,328 @@
+import os
+import time
+import threading
+import numpy as np
+
+
+class RecordingStore:
+    """
+    Growable storage for the recorded multi-channel signal.
+
+    Samples are kept in a pre-allocated (channels, capacity) array.
+    When the capacity is exhausted the array grows geometrically, so
+    appending a packet costs O(packet) amortized, independent of how
+    long the recording already is. Slicing by sample range returns
+    views into the storage without copying.
+    """
+
+    GROWTH_FACTOR = 2
+
+    def __init__(self, channels=32, initial_capacity=120000, dtype=np.float32):
+        """
+        Initialize an empty recording store.
+
+        Parameters:
+        - channels (int): Number of channels.
+        - initial_capacity (int): Number of samples pre-allocated per channel.
+        - dtype (np.dtype): Sample data type.
+        """
+        self.channels = channels
+        self.initial_capacity = max(1, initial_capacity)
+        self.dtype = dtype
+        self.buffer = np.empty((channels, self.initial_capacity), dtype=dtype)
+        self.length = 0
+        self.generation = 0  # incremented whenever the recording is cleared
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def capacity(self):
+        """
+        Number of samples that fit before the storage has to grow.
+        """
+        return self.buffer.shape[1]
+
+    def append(self, new_data):
+        """
+        Append new samples to the end of the recording.
+
+        Parameters:
+        - new_data (np.ndarray): Signal data of shape (channels, samples).
+        """
+        _, num_new_samples = new_data.shape
+        with self.lock:
+            end = self.length + num_new_samples
+            if end > self.capacity:
+                self._grow(end)
+            self.buffer[:, self.length:end] = new_data
+            self.length = end
+
+    def truncate(self, length):
+        """
+        Drop all samples from the given index on, keeping the capacity.
+
+        Parameters:
+        - length (int): Number of samples to keep.
+        """
+        with self.lock:
+            self.length = min(self.length, max(0, length))
+
+    def _grow(self, min_capacity):
+        """
+        Re-allocate the storage with geometrically increased capacity.
+
+        Parameters:
+        - min_capacity (int): Number of samples that must fit afterwards.
+        """
+        new_capacity = self.capacity
+        while new_capacity < min_capacity:
+            new_capacity *= self.GROWTH_FACTOR
+        new_buffer = np.empty((self.channels, new_capacity), dtype=self.dtype)
+        new_buffer[:, :self.length] = self.buffer[:, :self.length]
+        self.buffer = new_buffer
+
+    def view(self, start=None, stop=None, channels=slice(None)):
+        """
+        Get a range of the recording without copying.
+
+        Parameters:
+        - start (int): First sample index, defaults to the beginning.
+        - stop (int): Sample index after the last sample, defaults to the end.
+        - channels (int | slice | list): Channel selection.
+
+        Returns:
+        - np.ndarray: View of shape (channels, samples),
+          or (samples,) if a single channel index is given.
+        """
+        with self.lock:
+            recorded = self.buffer[:, :self.length]
+        return recorded[channels, start:stop]
+
+    @property
+    def data(self):
+        """
+        View of the whole recording, shape (channels, samples).
+        """
+        return self.view()
+
+    def clear(self):
+        """
+        Drop all samples and release memory beyond the initial capacity.
+        """
+        with self.lock:
+            if self.capacity > self.initial_capacity:
+                self.buffer = np.empty((self.channels, self.initial_capacity), dtype=self.dtype)
+            self.length = 0
+            self.generation += 1
+
+
+class MemmapRecordingStore:
+    """
+    Recording storage streamed into a memory-mapped file on disk.
+
+    Every session is written to its own file inside a directory. The file
+    starts with a small header (channel count, sampling rate, number of
+    recorded samples) followed by float32 samples in sample-major order,
+    so each appended packet is one contiguous write at the end of the data.
+    Reads go through the OS page cache, keeping RAM use bounded for
+    arbitrarily long recordings.
+
+    The header length is updated after every append, so a file left behind
+    by a crashed application can still be opened with `open`. The file grows
+    geometrically and may be larger than the recorded data; the unused
+    tail is never read.
+    """
+
+    MAGIC = b'EMGRECRD'
+    VERSION = 1
+    HEADER_SIZE = 64
+    HEADER_DTYPE = np.dtype([
+        ('magic', 'S8'),
+        ('version', '<u4'),
+        ('channels', '<u4'),
+        ('sampling_rate', '<f8'),
+        ('length', '<u8'),
+    ])
+    FILE_EXTENSION = '.emgrec'
+    GROWTH_FACTOR = 2
+
+    def __init__(self, directory, channels=32, sampling_rate=2000, initial_capacity=120000):
+        """
+        Initialize the store and create the file for a first session.
+
+        Parameters:
+        - directory (str): Directory the session files are written to.
+        - channels (int): Number of channels.
+        - sampling_rate (float): Sampling rate in Hz, stored in the header.
+        - initial_capacity (int): Number of samples the file is sized for initially.
+        """
+        self.directory = directory
+        self.channels = channels
+        self.sampling_rate = sampling_rate
+        self.initial_capacity = max(1, initial_capacity)
+        self.dtype = np.float32
+        self.read_only = False
+        self.path = None
+        self.header = None
+        self.samples = None
+        self.length = 0
+        self.generation = -1  # incremented for every new session file
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.new_session()
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open a finished (or interrupted) session file read-only.
+
+        Parameters:
+        - path (str): Path of the session file.
+
+        Returns:
+        - MemmapRecordingStore: Store exposing the recorded samples.
+        """
+        header = np.memmap(path, dtype=cls.HEADER_DTYPE, mode='r', shape=(1,))[0]
+        if header['magic'] != cls.MAGIC:
+            raise ValueError(f"{path} is not an EMG recording file")
+        if header['version'] != cls.VERSION:
+            raise ValueError(f"Unsupported recording file version {header['version']}")
+
+        store = cls.__new__(cls)
+        store.directory = os.path.dirname(path)
+        store.channels = int(header['channels'])
+        store.sampling_rate = float(header['sampling_rate'])
+        store.initial_capacity = max(1, int(header['length']))
+        store.dtype = np.float32
+        store.read_only = True
+        store.path = path
+        store.header = None
+        store.length = int(header['length'])
+        store.generation = 0
+        store.samples = np.memmap(
+            path, dtype=store.dtype, mode='r', offset=cls.HEADER_SIZE,
+            shape=(store.initial_capacity, store.channels)
+        )
+        store.lock = threading.Lock()
+        return store
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def capacity(self):
+        """
+        Number of samples that fit before the file has to grow.
+        """
+        return self.samples.shape[0]
+
+    def new_session(self):
+        """
+        Start a new session file. The previous file is left on disk untouched.
+        """
+        with self.lock:
+            self.path = self._new_session_path()
+            self._map(self.initial_capacity, mode='w+')
+            self.header['magic'] = self.MAGIC
+            self.header['version'] = self.VERSION
+            self.header['channels'] = self.channels
+            self.header['sampling_rate'] = self.sampling_rate
+            self.header['length'] = 0
+            self.length = 0
+            self.generation += 1
+        print(f"Recording to {self.path}")
+
+    def _new_session_path(self):
+        """
+        Build a unique, timestamped file name for a new session.
+        """
+        stem = time.strftime("recording_%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, stem + self.FILE_EXTENSION)
+        index = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{stem}_{index}{self.FILE_EXTENSION}")
+            index += 1
+        return path
+
+    def _map(self, capacity, mode='r+'):
+        """
+        (Re-)map header and sample region of the current file.
+
+        Parameters:
+        - capacity (int): Number of samples the sample region is sized for.
+        - mode (str): np.memmap mode, 'w+' creates the file.
+        """
+        if mode == 'r+':
+            os.truncate(self.path, self.HEADER_SIZE + capacity * self.channels * np.dtype(self.dtype).itemsize)
+        self.samples = np.memmap(
+            self.path, dtype=self.dtype, mode=mode, offset=self.HEADER_SIZE,
+            shape=(capacity, self.channels)
+        )
+        self.header = np.memmap(self.path, dtype=self.HEADER_DTYPE, mode='r+', shape=(1,))
+
+    def append(self, new_data):
+        """
+        Append new samples to the end of the session file.
+
+        Parameters:
+        - new_data (np.ndarray): Signal data of shape (channels, samples).
+        """
+        if self.read_only:
+            raise ValueError("Recording file is opened read-only")
+        _, num_new_samples = new_data.shape
+        with self.lock:
+            end = self.length + num_new_samples
+            if end > self.capacity:
+                new_capacity = self.capacity
+                while new_capacity < end:
+                    new_capacity *= self.GROWTH_FACTOR
+                self._map(new_capacity)
+            self.samples[self.length:end] = new_data.T
+            self.length = end
+            self.header['length'] = end
+
+    def view(self, start=None, stop=None, channels=slice(None)):
+        """
+        Get a range of the recording without copying.
+
+        Parameters:
+        - start (int): First sample index, defaults to the beginning.
+        - stop (int): Sample index after the last sample, defaults to the end.
+        - channels (int | slice | list): Channel selection.
+
+        Returns:
+        - np.ndarray: View of shape (channels, samples),
+          or (samples,) if a single channel index is given.
+        """
+        with self.lock:
+            recorded = self.samples[:self.length]
+        return recorded.T[channels, start:stop]
+
+    @property
+    def data(self):
+        """
+        View of the whole recording, shape (channels, samples).
+        """
+        return self.view()
+
+    def flush(self):
+        """
+        Write dirty pages of the current session file to disk.
+        """
+        if not self.read_only:
+            self.samples.flush()
+            self.header.flush()
+
+    def clear(self):
+        """
+        Finish the current session and continue recording into a new file.
+
+        A session without samples is kept and recorded into, so clearing
+        an empty recording leaves no empty files behind.
+        """
+        if self.length == 0:
+            return
+        self.flush()
+        self.new_session()
@@ -1,45 +1,16 @@
 from service.tcp_client import EMGTCPClient
 from service.tcp_server import EMGTCPServer
+from service.async_tcp import AsyncEMGTCPClient, AsyncEMGTCPServer
+from service.recording_store import RecordingStore, MemmapRecordingStore
+from service.decimation import MinMaxPyramid
+from service.tracing import LatencyTracer
+from service.live_buffer import LiveSignalBuffer
 import numpy as np
+import asyncio
 import threading
 import time
 
 
-class LiveSignalBuffer:
-    """
-    Rolling buffer for latest live signal data
-    for visualization or further processing.
-    Stores all 32 channels. Fixed length.
-    """
-
-    def __init__(self, channels=32, window_samples=20000):
-        """
-        Initialize the live signal buffer.
-
-        Parameters:
-        - channels (int): Number of channels (e.g., 32 EMG electrodes).
-        - window_samples (int): Number of samples to retain in the buffer.
-          Typically calculated as (sampling_rate * window_size).
-        """
-        self.buffer = np.zeros((channels, window_samples), dtype=np.float32)
-        self.t0 = time.time()
-
-    def update(self, new_data):
-        """
-        Update the buffer with new incoming data.
-
-        Parameters:
-        - new_data (np.ndarray): New signal data of shape (channels, samples).
-
-        Returns:
-        - np.ndarray: Buffer of same length with added new_data.
-        """
-        _, num_new_samples = new_data.shape
-        self.buffer = np.roll(self.buffer, -num_new_samples, axis=1)
-        self.buffer[:, -num_new_samples:] = new_data
-        return self.buffer
-
-
 class SignalProcessor:
     """
     Manages live signal processing via TCP client-server communication.
@@ -52,7 +23,8 @@ class SignalProcessor:
     - Exposes them for visualization or further processing.
     """
 
-    def __init__(self):
+    def __init__(self, recording_dir=None, source_file=None, use_asyncio=False, speed=1.0,
+                 tcp_server=None, tcp_client=None):
         """
         Initialize the signal processor with TCP client and server.
 
@@ -61,18 +33,40 @@ class SignalProcessor:
         - Sampling configuration
         - Live signal buffer and output
         - Signal recording
+
+        Parameters:
+        - recording_dir (str): Optional directory to stream recordings into
+          memory-mapped session files. Recordings are kept in RAM if None.
+        - source_file (str): Optional memory-mapped .npy source for the server,
+          see service.emg_source. The pickled recording is used if None.
+        - use_asyncio (bool): Run the asyncio server and client on a dedicated
+          event-loop thread instead of the thread-based ones.
+        - speed (float): Replay speed of the server relative to real time,
+          None to stream unpaced.
+        - tcp_server (EMGTCPServer): Optional preconfigured thread-based server,
+          e.g. with another channel count. Replaces source_file and speed.
+        - tcp_client (EMGTCPClient): Optional client matching tcp_server.
         """
         # Initialize TCP server and client
-        self.tcp_server = EMGTCPServer()
-        self.tcp_client = EMGTCPClient()
+        self.use_asyncio = use_asyncio
+        if use_asyncio:
+            self.tcp_server = AsyncEMGTCPServer(source_file=source_file, speed=speed)
+            self.tcp_client = AsyncEMGTCPClient()
+            self.event_loop = asyncio.new_event_loop()
+            self.event_loop_thread = threading.Thread(target=self.event_loop.run_forever, daemon=True)
+            self.event_loop_thread.start()
+            self.client_task = None
+        else:
+            self.tcp_server = tcp_server or EMGTCPServer(source_file=source_file, speed=speed)
+            self.tcp_client = tcp_client or EMGTCPClient()
 
 
         # Configure sampling parameters
         self.sampling_rate = self.tcp_server.sampling_rate
         self.sleep_time = self.tcp_server.sleep_time
         self.live_window_time = 5 # seconds
-        self.live_window_size = self.live_window_time * self.tcp_server.sampling_rate # 5 seconds of data
-        self.num_channels = 32
+        self.live_window_size = int(self.live_window_time * self.tcp_server.sampling_rate) # 5 seconds of data
+        self.num_channels = self.tcp_server.CHANNELS
 
         # Create buffer for live signal data
         self.live_signal_buffer = LiveSignalBuffer(
@@ -80,13 +74,49 @@ class SignalProcessor:
             window_samples=self.live_window_size
         )
 
-        # Initialize live signal and recording storage
-        self.live_signal = np.zeros((self.num_channels, self.live_window_size), dtype=np.float32)
-        self.recorded_signal = np.zeros_like(self.live_signal[:, -1:])
+        # Incremented after every packet written to the live buffer and recording,
+        # and when the recording is cleared (see bump_data_version).
+        # Consumers compare it to the value they last rendered to detect new data.
+        self.data_version = 0
+
+        # Initialize recording storage, pre-allocated for one minute of data
+        if recording_dir is None:
+            self.recording = RecordingStore(
+                channels=self.num_channels,
+                initial_capacity=int(60 * self.sampling_rate)
+            )
+        else:
+            self.recording = MemmapRecordingStore(
+                recording_dir,
+                channels=self.num_channels,
+                sampling_rate=self.sampling_rate,
+                initial_capacity=int(60 * self.sampling_rate)
+            )
+        # Min/max summary of the recording for plotting, built as packets arrive
+        self.recording_pyramid = MinMaxPyramid(self.recording)
+        self.clear_recording()
 
         # Recording state
         self.is_recording = False
 
+        # Latency tracing of sampled packets, off by default
+        self.tracer = LatencyTracer()
+        self.tracing = False
+
+    @property
+    def live_signal(self):
+        """
+        Copy of the current live window in time order, shape (channels, samples).
+        """
+        return self.live_signal_buffer.latest()
+
+    @property
+    def recorded_signal(self):
+        """
+        View of the whole recording, shape (channels, samples).
+        """
+        return self.recording.data
+
     def start_server(self):
         """
         Start the TCP server thread.
@@ -111,36 +141,116 @@ class SignalProcessor:
 
         while self.tcp_client.connected:
             # Receive the latest data from the server
-            new_data = self.tcp_client.receive_data()
+            self.ingest(self.tcp_client.receive_data())
 
-            # If recording is active, update the live signal buffer and recorded signal
-            if not self.is_recording:
-                continue
-            if new_data is not None:
-                self.live_signal = self.live_signal_buffer.update(new_data)
-                self.recorded_signal = np.concatenate((self.recorded_signal, new_data), axis=1)
-            else:
-                print("No new data received, waiting...")
+    async def run_async_client(self):
+        """
+        Receive data with the asyncio client until it is disconnected or cancelled.
+        Update live signal and recording.
+        """
+        while self.tcp_client.connected:
+            self.ingest(await self.tcp_client.receive_data())
+
+    def ingest(self, new_data):
+        """
+        Add a received packet to the live signal buffer and the recording.
+
+        Parameters:
+        - new_data (np.ndarray): Packet of shape (channels, samples), or None.
+        """
+        # If recording is active, update the live signal buffer and recorded signal
+        if not self.is_recording:
+            return
+        if new_data is not None:
+            self.live_signal_buffer.update(new_data)
+            self.recording.append(new_data)
+            self.recording_pyramid.update()
+            self.bump_data_version()
+            if self.tracing:
+                self.tracer.buffered(self.tcp_client.packet_sequence)
+        else:
+            print("No new data received, waiting...")
+
+    def set_tracing(self, enabled):
+        """
+        Enable or disable latency tracing in server, client and buffering.
+
+        Parameters:
+        - enabled (bool): True to trace sampled packets. Enabling clears
+          the latencies collected before.
+        """
+        if enabled and not self.tracing:
+            self.tracer.clear()
+        self.tracing = enabled
+        self.tcp_server.tracer = self.tracer if enabled else None
+        self.tcp_client.tracer = self.tracer if enabled else None
+
+    async def start_async(self):
+        """
+        Start the asyncio server, connect the client and start receiving.
+        """
+        await self.tcp_server.start()
+        await self.tcp_client.connect()
+        self.client_task = asyncio.create_task(self.run_async_client())
+
+    async def stop_async(self):
+        """
+        Cancel receiving and close the asyncio client and server.
+        """
+        if self.client_task is not None:
+            self.client_task.cancel()
+            try:
+                await self.client_task
+            except asyncio.CancelledError:
+                pass
+            self.client_task = None
+        await self.tcp_client.close()
+        await self.tcp_server.stop()
 
     def generate_signal(self):
         """
         Main entry point for signal generation.
         Start TCP server and client to begin live data streaming.
         """
-        self.start_server()
-        self.start_client()
+        if self.use_asyncio:
+            asyncio.run_coroutine_threadsafe(self.start_async(), self.event_loop).result()
+        else:
+            self.start_server()
+            self.start_client()
         print("Signal generation started.")
 
     def stop_signal(self):
         """
         Stop data acquisition by closing the client and server.
         """
-        self.tcp_client.close()
-        self.tcp_server.stop()
+        if self.use_asyncio:
+            asyncio.run_coroutine_threadsafe(self.stop_async(), self.event_loop).result()
+        else:
+            self.tcp_client.close()
+            self.tcp_server.stop()
         print("Signal generation stopped.")
 
     def clear_recording(self):
         """
         Reset the recorded signal to one sample of zeroes.
+
+        A recording holding only that sample is left as it is, so a new or
+        already cleared session is not replaced by another (empty) file.
+        """
+        if len(self.recording) > 1:
+            self.recording.clear()
+        if len(self.recording) == 0:
+            self.recording.append(np.zeros((self.num_channels, 1), dtype=np.float32))
+        self.recording_pyramid.update()
+        self.bump_data_version()
+
+    def bump_data_version(self):
+        """
+        Count a change of the live buffer or the recording.
+
+        Packets are ingested on the client thread and the recording is
+        cleared on the recording worker, so the increment is done under the
+        recording lock.
         """
-        self.recorded_signal = np.zeros_like(self.live_signal[:, -1:])
+        with self.recording.lock:
+            self.data_version += 1
@@ -2,18 +2,129 @@ import socket
 import numpy as np
 import time
 
+from service import protocol
+
 class EMGTCPClient:
-    def __init__(self, host='localhost', port=12345):
+    def __init__(self, host='localhost', port=12345, protocol_version=protocol.PROTOCOL_VERSION,
+                 channels=32, samples_per_packet=18):
         self.host = host
         self.port = port
+        self.protocol_version = protocol_version
         self.socket = None
         self.connected = False
-        self.CHANNELS = 32
-        self.SAMPLES_PER_PACKET = 18
+        self.CHANNELS = channels
+        self.SAMPLES_PER_PACKET = samples_per_packet
         self.window_count = 0
+        self.tracer = None  # LatencyTracer while tracing is enabled
+
+        # Preallocated receive buffers, filled by exact-length reads.
+        # The batch buffer grows to the largest number of packets per frame.
+        self.header_buffer = bytearray(protocol.HEADER_SIZE)
+        self.packet_size = self.CHANNELS * self.SAMPLES_PER_PACKET * 4  # 4 bytes per float32
+        self.allocate_batch(1)
+        self.frame_header = None  # header of the frame being received, None for version 1
+        self.frame_packet_count = 1
 
+        self.reset_stats()
         self.t0 = time.time()
 
+    def reset_stats(self):
+        """Reset the packet counters"""
+        self.packets_received = 0
+        self.lost_packets = 0        # packets skipped by gaps in the sequence numbers
+        self.duplicate_packets = 0   # packets with an already received sequence number
+        self.last_sequence = None
+        self.last_timestamp = None   # sender timestamp of the latest packet
+        self.batch_count = 0         # packets in the latest received frame
+        self.batch_index = 0         # next of them to return
+
+    def allocate_batch(self, packet_count):
+        """
+        Allocate the receive buffer for frames of up to packet_count packets.
+        """
+        self.batch_buffer = bytearray(packet_count * self.packet_size)
+        self.batch = np.frombuffer(self.batch_buffer, dtype=np.float32).reshape(
+            packet_count, self.CHANNELS, self.SAMPLES_PER_PACKET
+        )
+
+    def batch_view(self, packet_count):
+        """
+        Writable view of the receive buffer for a frame of packet_count packets.
+        """
+        if packet_count > len(self.batch):
+            self.allocate_batch(packet_count)
+        return memoryview(self.batch_buffer)[:packet_count * self.packet_size]
+
+    def check_header(self, header):
+        """
+        Validate the packet layout announced by a frame header.
+        """
+        if (header.channels, header.samples) != (self.CHANNELS, self.SAMPLES_PER_PACKET) \
+                or header.packet_count < 1:
+            raise ValueError(
+                f"Unexpected packet layout {header.packet_count} x "
+                f"({header.channels}, {header.samples})"
+            )
+
+    def receive_buffers(self):
+        """
+        Buffers to fill from the socket, in order, to receive the next frame.
+
+        Shared by the blocking and the asyncio client, which only differ in
+        how a buffer is filled. The header (version 2) is validated before
+        the payload buffer for its packet count is yielded. Call
+        complete_frame once all buffers are filled.
+        """
+        self.frame_header = None
+        self.frame_packet_count = 1
+        if self.protocol_version >= 2:
+            yield self.header_buffer
+            self.frame_header = protocol.unpack_header(self.header_buffer)
+            self.check_header(self.frame_header)
+            self.frame_packet_count = self.frame_header.packet_count
+        # packet_count × 32 channels × 18 samples of float32
+        yield self.batch_view(self.frame_packet_count)
+
+    def complete_frame(self):
+        """
+        Track the sequence numbers of the received frame and return its first packet.
+
+        Returns None if the frame is a duplicate, it is dropped.
+        """
+        if self.frame_header is not None and not self.track_sequence(self.frame_header):
+            return None
+        return self.start_batch(self.frame_packet_count)
+
+    def start_batch(self, packet_count):
+        """
+        Mark the packets of a received frame as pending and return the first.
+        """
+        self.batch_count = packet_count
+        self.batch_index = 0
+        return self.next_packet()
+
+    def next_packet(self):
+        """
+        Next pending packet of the latest frame, None if all were returned.
+        """
+        if self.batch_index >= self.batch_count:
+            return None
+        packet = self.batch[self.batch_index]
+        self.batch_index += 1
+        self.packets_received += 1
+        if self.tracer is not None:
+            self.tracer.stamp(self.packet_sequence, 'receive')
+        return packet
+
+    @property
+    def packet_sequence(self):
+        """
+        Sequence number of the packet returned last, None without frame headers.
+        """
+        if self.last_sequence is None:
+            return None
+        return self.last_sequence - (self.batch_count - self.batch_index)
+
     def print_data(self, data):
         """Print the received chunk of data"""
         print(f"\nReceived window {self.window_count}:")
@@ -27,42 +138,84 @@ class EMGTCPClient:
             self.socket.connect((self.host, self.port))
             self.connected = True
             print(f"Connected to server at {self.host}:{self.port}")
+            self.reset_stats()
             self.t0 = time.time()
         except Exception as e:
             print(f"Error connecting to server: {e}")
             self.connected = False
 
+    def receive_exact(self, buffer):
+        """
+        Fill the whole buffer from the socket, however the stream is split up.
+
+        Returns False if the connection was closed before the buffer was full.
+        """
+        view = memoryview(buffer)
+        received = 0
+        while received < len(view):
+            count = self.socket.recv_into(view[received:])
+            if count == 0:
+                return False
+            received += count
+        return True
+
     def receive_data(self):
-        """Receive and process EMG data from the server"""
+        """
+        Receive and process EMG data from the server.
+
+        Frames carrying several packets are received with one read and
+        returned packet by packet by the following calls.
+
+        Returns a (channels, samples) array backed by the client's receive
+        buffer. It is overwritten by the next calls, copy it to keep it.
+        """
         if not self.connected:
             print("Not connected to server")
             return None
 
+        packet = self.next_packet()
+        if packet is not None:
+            return packet
+
         try:
-            # Receive data (32 channels × 18 samples of float32)
-            buffer_size = self.CHANNELS * self.SAMPLES_PER_PACKET * 4  # 4 bytes per float32
-            data = self.socket.recv(buffer_size)
-
-            if not data:
-                print("Connection closed by server")
-                self.connected = False
-                return None
-            
-            data_array = np.frombuffer(data, dtype=np.float32).reshape(self.CHANNELS, self.SAMPLES_PER_PACKET)
-
-            return data_array
-            
+            while True:
+                for buffer in self.receive_buffers():
+                    if not self.receive_exact(buffer):
+                        print("Connection closed by server")
+                        self.connected = False
+                        return None
+                packet = self.complete_frame()
+                if packet is not None:
+                    return packet
+                # Duplicate dropped, wait for the next frame
+
         except Exception as e:
             print(f"Error receiving data: {e}")
             self.connected = False
             return None
 
+    def track_sequence(self, header):
+        """
+        Update gap and duplicate counters from a frame header.
+
+        Returns False if the frame is a duplicate and should be dropped.
+        """
+        if self.last_sequence is not None:
+            if header.sequence <= self.last_sequence:
+                self.duplicate_packets += header.packet_count
+                return False
+            self.lost_packets += header.sequence - self.last_sequence - 1
+        self.last_sequence = header.sequence + header.packet_count - 1
+        self.last_timestamp = header.timestamp
+        return True
+
     def close(self):
         """Close the connection"""
         if self.socket:
             self.socket.close()
             self.connected = False
-            print("Connection closed")
+            print(f"Connection closed ({self.packets_received} packets received, "
+                  f"{self.lost_packets} lost, {self.duplicate_packets} duplicates)")
 
 def main():
     # Create and connect the client
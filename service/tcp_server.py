@@ -1,35 +1,317 @@
-import pickle
+import argparse
+import selectors
 import socket
 import threading
 import time
 import os
+from collections import deque
+
+import numpy as np
+
+from service import protocol
+from service.emg_source import load_emg_signal
+
+
+def lateness_stats(send_lateness):
+    """
+    Summarize how late frames were sent relative to their schedule.
+
+    Parameters:
+    - send_lateness (iterable): Lateness of each frame in seconds.
+
+    Returns:
+    - dict: Number of frames and mean, 99th percentile and maximum lateness in ms.
+    """
+    if not send_lateness:
+        return {'frames': 0, 'mean_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    lateness = np.asarray(send_lateness) * 1000
+    return {
+        'frames': len(lateness),
+        'mean_ms': float(lateness.mean()),
+        'p99_ms': float(np.percentile(lateness, 99)),
+        'max_ms': float(lateness.max()),
+    }
+
+
+def rate_stats(packets, num_bytes, seconds):
+    """
+    Summarize the throughput of a stream.
+
+    Parameters:
+    - packets (int): Number of packets streamed.
+    - num_bytes (int): Number of bytes sent, summed over all clients.
+    - seconds (float): Duration of the stream.
+
+    Returns:
+    - dict: Packets, bytes and seconds, and packets and bytes per second.
+    """
+    return {
+        'packets': packets,
+        'bytes': num_bytes,
+        'seconds': seconds,
+        'packets_per_s': packets / seconds if seconds > 0 else 0.0,
+        'bytes_per_s': num_bytes / seconds if seconds > 0 else 0.0,
+    }
+
+
+def parse_speed(text):
+    """
+    Parse a replay speed factor given on the command line.
+
+    Parameters:
+    - text (str): Factor relative to real time, e.g. '1', '10' or '100',
+      or 'unpaced' to send as fast as the clients receive.
+
+    Returns:
+    - float | None: Speed factor, None for unpaced.
+    """
+    if text.lower() in ('unpaced', 'max'):
+        return None
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'unpaced'")
+    return speed
+
+
+def frame_buffers(packets, first, count, sequence, protocol_version):
+    """
+    Buffers of one frame carrying consecutive packets, without copying the payload.
+
+    Parameters:
+    - packets (np.ndarray): float32 packets of shape (packets, channels, samples).
+    - first (int): Index of the first packet in the frame.
+    - count (int): Number of packets in the frame.
+    - sequence (int): Sequence number of the first packet.
+    - protocol_version (int): 1 sends the bare payload, 2 prefixes the header.
+
+    Returns:
+    - tuple: Header (version 2 only) and payload as bytes-like objects.
+    """
+    batch = packets[first:first + count]
+    if batch.flags.c_contiguous:
+        payload = memoryview(batch).cast('B')
+    else:
+        payload = batch.tobytes()
+    if protocol_version < 2:
+        return (payload,)
+    _, channels, samples = packets.shape
+    header = protocol.pack_header(sequence, time.time(), channels, samples, packet_count=count)
+    return header, payload
+
+
+SLOW_CLIENT_POLICIES = ('drop', 'disconnect')
+
+
+def check_stream_options(slow_client_policy, packets_per_send, speed, max_packets):
+    """
+    Validate the streaming options of EMGTCPServer and AsyncEMGTCPServer.
+
+    Raises:
+    - ValueError: If an option is out of range.
+    """
+    if slow_client_policy not in SLOW_CLIENT_POLICIES:
+        raise ValueError(f"Unknown slow client policy {slow_client_policy!r}")
+    if packets_per_send < 1:
+        raise ValueError("packets_per_send must be at least 1")
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be positive, or None for unpaced")
+    if max_packets is not None and max_packets < 1:
+        raise ValueError("max_packets must be at least 1")
+
+
+def load_packets(pkl_file, source_file, channels):
+    """
+    Load the packets a server streams, from a memory-mapped source file or a pickle.
+
+    Parameters:
+    - pkl_file (str): Pickled recording, used if source_file is None.
+    - source_file (str): Memory-mapped .npy source file, packets are paged in when they are sent.
+    - channels (int): Number of channels to stream.
+
+    Returns:
+    - tuple(np.ndarray, float): float32 packets of shape (packets, channels,
+      samples_per_packet) and the sampling rate in Hz.
+
+    Raises:
+    - ValueError: If the source has fewer channels than requested.
+    """
+    packets, sampling_rate = load_emg_signal(pkl_file, source_file, channels=channels)
+    num_channels = packets.shape[1]
+    if num_channels != channels:
+        raise ValueError(f"Source has {num_channels} channels, {channels} requested")
+    # Shape in the (channels, samples, packets) layout of the original recording
+    print(f"Data loaded successfully. Shape: {packets.transpose(1, 2, 0).shape}")
+    print(f"Sampling rate: {sampling_rate} Hz")
+    return packets, sampling_rate
+
+
+class ClientConnection:
+    """
+    Non-blocking connection to one client with a bounded queue of frames.
+
+    Frames are shared between all clients and sent from the queue as far
+    as the socket accepts them, several queued frames per system call where
+    the platform supports scatter-gather sends; a partially sent frame is
+    continued on the next flush.
+    """
+
+    MAX_BUFFERS_PER_SEND = 64
+
+    def __init__(self, client_socket, address, max_queue_packets):
+        """
+        Parameters:
+        - client_socket (socket.socket): Connected socket, set to non-blocking.
+        - address (tuple): Address of the client.
+        - max_queue_packets (int): Number of packets queued before the slow-client policy applies.
+        """
+        self.socket = client_socket
+        self.socket.setblocking(False)
+        self.address = address
+        self.max_queue_packets = max_queue_packets
+        self.queue = deque()  # (buffers, size, packet_count) of frames not (completely) sent yet
+        self.queued_packets = 0
+        self.offset = 0  # bytes of the first queued frame already sent
+        self.dropped_packets = 0
+        self.bytes_sent = 0
+        self.waiting_for_write = False  # registered for EVENT_WRITE
+
+    def is_full(self):
+        return self.queued_packets >= self.max_queue_packets
+
+    def enqueue(self, buffers, packet_count=1):
+        """
+        Queue a frame for sending.
+
+        Parameters:
+        - buffers (tuple): Bytes-like parts of the frame, e.g. header and payload.
+        - packet_count (int): Number of packets in the frame.
+        """
+        self.queue.append((buffers, sum(len(buffer) for buffer in buffers), packet_count))
+        self.queued_packets += packet_count
+
+    def drop_oldest(self):
+        """
+        Drop the oldest queued frame whose sending has not started yet.
+        """
+        index = 1 if self.offset else 0
+        if index < len(self.queue):
+            _, _, packet_count = self.queue[index]
+            del self.queue[index]
+            self.queued_packets -= packet_count
+            self.dropped_packets += packet_count
+
+    def pending_buffers(self):
+        """
+        Unsent parts of the first queued frames, at most MAX_BUFFERS_PER_SEND.
+        """
+        buffers = []
+        skip = self.offset
+        for frame_buffers, _, _ in self.queue:
+            for buffer in frame_buffers:
+                if skip >= len(buffer):
+                    skip -= len(buffer)
+                    continue
+                buffers.append(memoryview(buffer)[skip:] if skip else buffer)
+                skip = 0
+            if len(buffers) >= self.MAX_BUFFERS_PER_SEND:
+                break
+        return buffers
+
+    def flush(self):
+        """
+        Send queued frames until the queue is empty or the socket would block.
+
+        Returns:
+        - bool: True if frames are left in the queue.
+        """
+        while self.queue:
+            buffers = self.pending_buffers()
+            if not hasattr(self.socket, 'sendmsg'):
+                buffers = buffers[:1]
+            try:
+                sent = self.socket.sendmsg(buffers) if len(buffers) > 1 else self.socket.send(buffers[0])
+            except BlockingIOError:
+                break
+            self.bytes_sent += sent
+            complete = sent == sum(len(buffer) for buffer in buffers)
+
+            # Remove completely sent frames, remember how far the next one got
+            sent += self.offset
+            while self.queue and sent >= self.queue[0][1]:
+                _, size, packet_count = self.queue.popleft()
+                sent -= size
+                self.queued_packets -= packet_count
+            self.offset = sent
+
+            if not complete:
+                break  # socket buffer is full
+        return bool(self.queue)
+
 
 class EMGTCPServer:
-    def __init__(self, host='localhost', port=12345, pkl_file=os.path.join(os.path.dirname(__file__), 'recording.pkl')):
+    """
+    Simulated EMG device streaming packets to any number of TCP clients.
+
+    A single thread paces the stream: every packet is built once and
+    fanned out to all connected clients through non-blocking sends on one
+    selector. Clients join the running stream. Each client has a bounded
+    queue; when a client falls behind, the slow-client policy either drops
+    its oldest queued packets ('drop', visible to the client as a sequence
+    gap) or disconnects it ('disconnect').
+
+    The source is held in packet-major order, so the payload of a frame is
+    a memoryview of the source, never a copy. With packets_per_send = k,
+    every frame carries k consecutive packets and is sent every k packet
+    periods, dividing the number of frames and system calls by k.
+
+    For throughput tests the stream can be replayed faster than real time
+    (speed), or unpaced: a frame is then sent as soon as no client queue
+    is full, so slow clients throttle the stream instead of losing packets.
+    With max_packets the stream ends after a fixed number of packets, once
+    they are sent the clients are disconnected and finished is set.
+    """
+
+    SLOW_CLIENT_POLICIES = SLOW_CLIENT_POLICIES
+
+    def __init__(self, host='localhost', port=12345, pkl_file=os.path.join(os.path.dirname(__file__), 'recording.pkl'),
+                 protocol_version=protocol.PROTOCOL_VERSION, source_file=None,
+                 max_queue_packets=500, slow_client_policy='drop', packets_per_send=1,
+                 speed=1.0, max_packets=None, channels=32):
+        check_stream_options(slow_client_policy, packets_per_send, speed, max_packets)
         self.host = host
         self.port = port
         self.pkl_file = pkl_file
+        self.source_file = source_file  # memory-mapped .npy source, used instead of pkl_file if set
+        self.protocol_version = protocol_version
+        self.max_queue_packets = max_queue_packets  # per client
+        self.slow_client_policy = slow_client_policy
+        self.packets_per_send = packets_per_send  # packets aggregated into one frame
+        self.speed = speed  # replay speed relative to real time, None for unpaced
+        self.max_packets = max_packets  # end the stream after this many packets, None to loop forever
         self.server_socket = None
-        self.clients = []
+        self.selector = None
+        self.clients = {}  # socket -> ClientConnection
         self.running = False
-        self.data = None
+        self.pacing_thread = None
+        self.send_lateness = deque(maxlen=10000)  # seconds behind schedule per frame
+        self.finished = threading.Event()  # set when the pacing loop has ended
+        self.tracer = None  # LatencyTracer while tracing is enabled
+        self.reset_throughput()
         self.sampling_rate = None
-        self.CHANNELS = 32
-        self.SAMPLES_PER_PACKET = 18
+        self.CHANNELS = channels
+        self.SAMPLES_PER_PACKET = None  # given by the source
         self.load_data()
         
         # calculate sleep time based on sampling rate and samples per packet
         self.sleep_time = self.SAMPLES_PER_PACKET / self.sampling_rate
 
     def load_data(self):
-        """Load the EMG data from the PKL file"""
+        """Load the EMG data from the memory-mapped source file or the PKL file"""
         try:
-            with open(self.pkl_file, 'rb') as f:
-                self.data = pickle.load(f)
-            self.emg_signal = self.data['biosignal'][:32, :, :]
-            self.sampling_rate = self.data['device_information']['sampling_frequency']
-            print(f"Data loaded successfully. Shape: {self.emg_signal.shape}")
-            print(f"Sampling rate: {self.sampling_rate} Hz")
+            self.packets, self.sampling_rate = load_packets(self.pkl_file, self.source_file, self.CHANNELS)
+            self.SAMPLES_PER_PACKET = self.packets.shape[2]
+            # (channels, samples, packets) view in the layout of the original recording
+            self.emg_signal = self.packets.transpose(1, 2, 0)
         except Exception as e:
             print(f"Error loading data: {e}")
             raise
@@ -44,56 +326,98 @@ class EMGTCPServer:
         print("-" * 50)
 
     def start(self):
-        """Start the TCP server"""
+        """Start the TCP server and its pacing thread"""
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
+        self.server_socket.listen(64)
+        self.server_socket.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server_socket, selectors.EVENT_READ)
+        self.send_lateness.clear()
+        self.reset_throughput()
+        self.finished.clear()
         self.running = True
         print(f"Server started on {self.host}:{self.port}")
 
-        # Start accepting connections in a separate thread
-        accept_thread = threading.Thread(target=self.accept_connections)
-        accept_thread.daemon = True
-        accept_thread.start()
+        self.pacing_thread = threading.Thread(target=self.run, daemon=True)
+        self.pacing_thread.start()
+
+    def run(self):
+        """
+        Pacing loop: produce one frame of packets_per_send packets per period
+        and fan it out to all clients, serving accepts and pending sends in between.
+        """
+        num_windows = len(self.packets)
+        window_index = 0
+        sequence = 0
+        next_time = None  # schedule starts with the first client
+        period = None if self.speed is None else self.sleep_time / self.speed
+        complete = False  # max_packets reached, remaining queues are being sent
+        cpu_start = time.thread_time()
 
-    def accept_connections(self):
-        """Accept incoming connections"""
-        while self.running:
-            try:
-                client_socket, address = self.server_socket.accept()
-                print(f"New connection from {address}")
-                self.clients.append(client_socket)
-                # Start a new thread to handle this client
-                client_thread = threading.Thread(target=self.handle_client, args=(client_socket,))
-                client_thread.daemon = True
-                client_thread.start()
-            except Exception as e:
-                if self.running:
-                    print(f"Error accepting connection: {e}")
-
-    def handle_client(self, client_socket):
-        """Handle a single client connection"""
         try:
-            # Get the total number of windows
-            num_windows = self.emg_signal.shape[2]
-            window_index = 0
-
-            next_time = time.time()
-            while self.running and window_index < num_windows:
-                current_window = self.emg_signal[..., window_index]
-                data_bytes = current_window.tobytes()
-                client_socket.sendall(data_bytes)
-
-                window_index = (window_index + 1) % num_windows
-
-                # Ensure constant sampling rate
-                next_time += self.sleep_time
-                sleep_duration = next_time - time.time()
-                if sleep_duration > 0:
-                    time.sleep(sleep_duration)
-                
-                window_index += 1
+            while self.running:
+                if complete:
+                    if not any(client.queue for client in self.clients.values()):
+                        break
+                    timeout = 0.1
+                elif not self.clients:
+                    next_time = None
+                    timeout = 0.1
+                else:
+                    if next_time is None:
+                        next_time = time.perf_counter()
+                        if self.stream_start is None:
+                            self.stream_start = next_time
+                    if period is None:
+                        # Unpaced: wait for writability while a client queue is full
+                        timeout = 0.1 if self.any_client_full() else 0.0
+                    else:
+                        timeout = max(0.0, next_time - time.perf_counter())
+
+                for key, events in self.selector.select(timeout):
+                    if key.fileobj is self.server_socket:
+                        self.accept_connection()
+                        continue
+                    if events & selectors.EVENT_READ:
+                        self.read_from_client(key.data)
+                    if events & selectors.EVENT_WRITE and key.fileobj in self.clients:
+                        self.flush_client(key.data)
+
+                if complete or next_time is None:
+                    continue
+                if period is None:
+                    if self.any_client_full():
+                        continue
+                elif time.perf_counter() < next_time:
+                    continue
+
+                # Build the frame once for all clients, frames do not wrap
+                # around the end of the data
+                count = min(self.packets_per_send, num_windows - window_index)
+                if self.max_packets is not None:
+                    count = min(count, self.max_packets - sequence)
+                buffers = frame_buffers(self.packets, window_index, count, sequence, self.protocol_version)
+                if period is not None:
+                    self.send_lateness.append(time.perf_counter() - next_time)
+                for client in list(self.clients.values()):
+                    self.send_to_client(client, buffers, count)
+                if self.tracer is not None:
+                    self.trace_frame(sequence, count, None if period is None else next_time)
+                sequence += count
+                self.packets_sent = sequence
+
+                if self.max_packets is not None and sequence >= self.max_packets:
+                    print(f"Sent {sequence} packets, finishing the stream.")
+                    complete = True
+                    continue
+
+                # Ensure constant sampling rate, late packets are caught up
+                if period is not None:
+                    next_time += count * period
+
+                window_index += count
 
                 # loop around if we reach the end of the data
                 if window_index >= num_windows:
@@ -101,30 +425,164 @@ class EMGTCPServer:
                     print("Restarting data transmission from the beginning.")
 
         except Exception as e:
-            print(f"Error handling client: {e}")
+            if self.running:
+                print(f"Error in server loop: {e}")
         finally:
-            if client_socket in self.clients:
-                self.clients.remove(client_socket)
-            client_socket.close()
+            self.stream_end = time.perf_counter()
+            self.pacing_cpu_time = time.thread_time() - cpu_start
+            for client in list(self.clients.values()):
+                self.disconnect_client(client)
+            self.selector.close()
+            self.finished.set()
+
+    def trace_frame(self, sequence, count, scheduled):
+        """
+        Stamp the traced packets of a frame that was just handed to the clients.
+
+        Parameters:
+        - sequence (int): Sequence number of the first packet.
+        - count (int): Number of packets in the frame.
+        - scheduled (float): perf_counter time the frame was due, None if unpaced.
+        """
+        sent = time.perf_counter()
+        for traced in self.tracer.sampled(sequence, count):
+            if scheduled is not None:
+                self.tracer.stamp(traced, 'scheduled', scheduled)
+            self.tracer.stamp(traced, 'send', sent)
+
+    def any_client_full(self):
+        """Whether the queue of any client has reached max_queue_packets"""
+        return any(client.is_full() for client in self.clients.values())
+
+    def accept_connection(self):
+        """Accept a pending connection, the client joins the running stream"""
+        try:
+            client_socket, address = self.server_socket.accept()
+        except BlockingIOError:
+            return
+        print(f"New connection from {address}")
+        client = ClientConnection(client_socket, address, self.max_queue_packets)
+        self.clients[client_socket] = client
+        self.selector.register(client_socket, selectors.EVENT_READ, client)
+
+    def read_from_client(self, client):
+        """Discard data sent by a client, disconnect it if the connection was closed"""
+        try:
+            if client.socket.recv(4096):
+                return
+        except BlockingIOError:
+            return
+        except OSError:
+            pass
+        self.disconnect_client(client)
+
+    def send_to_client(self, client, buffers, packet_count):
+        """Queue a frame for a client, applying the slow-client policy, and send what the socket accepts"""
+        if client.is_full():
+            if self.slow_client_policy == 'disconnect':
+                print(f"Disconnecting slow client {client.address}")
+                self.disconnect_client(client)
+                return
+            client.drop_oldest()
+        client.enqueue(buffers, packet_count)
+        self.flush_client(client)
+
+    def flush_client(self, client):
+        """Send queued frames of a client and wait for writability if some are left"""
+        try:
+            pending = client.flush()
+        except (ConnectionResetError, BrokenPipeError):
+            self.disconnect_client(client)
+            return
+        except OSError as e:
+            print(f"Error sending to client {client.address}: {e}")
+            self.disconnect_client(client)
+            return
+        if pending != client.waiting_for_write:
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+            self.selector.modify(client.socket, events, client)
+            client.waiting_for_write = pending
+
+    def disconnect_client(self, client):
+        """Unregister and close a client connection"""
+        if self.clients.pop(client.socket, None) is None:
+            return
+        self.selector.unregister(client.socket)
+        client.socket.close()
+        self.closed_bytes_sent += client.bytes_sent
+        print(f"Client {client.address} disconnected ({client.dropped_packets} packets dropped)")
+
+    def jitter_stats(self):
+        """
+        Statistics of how late frames were sent relative to the schedule.
+
+        Returns:
+        - dict: Number of frames and mean, 99th percentile and maximum lateness in ms.
+        """
+        return lateness_stats(self.send_lateness)
+
+    def reset_throughput(self):
+        """Reset the packet and byte counters of throughput_stats"""
+        self.packets_sent = 0
+        self.closed_bytes_sent = 0  # bytes sent to clients that are disconnected
+        self.stream_start = None  # perf_counter time of the first frame
+        self.stream_end = None  # perf_counter time the pacing loop ended
+        self.pacing_cpu_time = None  # CPU seconds of the pacing loop, set when it ended
+
+    def throughput_stats(self):
+        """
+        Achieved throughput since the first client connected, up to now or the end of the stream.
+
+        Returns:
+        - dict: Packets streamed, bytes sent to all clients, seconds, and packets and bytes per second.
+        """
+        num_bytes = self.closed_bytes_sent + sum(client.bytes_sent for client in list(self.clients.values()))
+        if self.stream_start is None:
+            return rate_stats(self.packets_sent, num_bytes, 0.0)
+        end = self.stream_end if self.stream_end is not None else time.perf_counter()
+        return rate_stats(self.packets_sent, num_bytes, end - self.stream_start)
+
+    def print_throughput(self):
+        """Print a summary of throughput_stats"""
+        stats = self.throughput_stats()
+        print(f"Throughput: {stats['packets']} packets in {stats['seconds']:.2f} s, "
+              f"{stats['packets_per_s']:.0f} packets/s, {stats['bytes_per_s'] / 1e6:.2f} MB/s")
 
     def stop(self):
         """Stop the TCP server"""
         self.running = False
+        if self.pacing_thread is not None and self.pacing_thread is not threading.current_thread():
+            self.pacing_thread.join(timeout=1)
         if self.server_socket:
             self.server_socket.close()
-        for client in self.clients:
-            client.close()
-        self.clients.clear()
-        print("Server stopped")
+        stats = self.jitter_stats()
+        print(f"Server stopped (send lateness over {stats['frames']} frames: "
+              f"mean {stats['mean_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms)")
+        self.print_throughput()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated EMG device")
+    parser.add_argument('--port', type=int, default=12345)
+    parser.add_argument('--source', default=None,
+                        help="Memory-mapped .npy source (see service/emg_source.py)")
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help="Replay speed relative to real time, e.g. 10 or 100, or 'unpaced'")
+    parser.add_argument('--max-packets', type=int, default=None,
+                        help="End the stream after this many packets")
+    parser.add_argument('--packets-per-send', type=int, default=1,
+                        help="Packets aggregated into one frame")
+    args = parser.parse_args()
+
     # Create and start the server
-    server = EMGTCPServer()
+    server = EMGTCPServer(
+        port=args.port, source_file=args.source, speed=args.speed,
+        max_packets=args.max_packets, packets_per_send=args.packets_per_send
+    )
     try:
         server.start()
-        # Keep the main thread alive
-        while True:
-            time.sleep(1)
+        # Keep the main thread alive until the stream is finished
+        while not server.finished.wait(1):
+            pass
     except KeyboardInterrupt:
         print("\nShutting down server...")
-        server.stop() 
\ No newline at end of file
+    server.stop() 
\ No newline at end of file
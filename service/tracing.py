@@ -0,0 +1,221 @@
+"""
+Latency tracing of sampled packets through the acquisition and display stages.
+
+Every sample_interval-th packet (by sequence number) is stamped with
+time.perf_counter() as it passes the stages:
+
+- scheduled: time the server pacing loop planned to send it
+- send:      handed to the client sockets by the server
+- receive:   returned by the client's receive_data
+- buffer:    written to the live buffer and the recording
+
+After buffering, a packet is handed to every display consumer (e.g. 'live'
+and 'recording'), which marks its own stages:
+
+- process:   processing of the data containing the packet finished
+- render:    the frame showing it was drawn
+
+The time between consecutive stages is collected per interval in rolling
+windows, available as statistics and histograms. Components only hold a
+reference to the tracer while tracing is enabled, so with tracing off the
+hot path costs one `is not None` check per packet.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Intervals shared by all consumers: (name, start stage, end stage)
+PACKET_INTERVALS = (
+    ('pacing', 'scheduled', 'send'),
+    ('transfer', 'send', 'receive'),
+    ('buffer', 'receive', 'buffer'),
+)
+
+# Display order of the intervals, consumer intervals are prefixed with the consumer
+INTERVAL_ORDER = ('pacing', 'transfer', 'buffer', 'process', 'compute', 'render', 'draw', 'total')
+
+
+def _interval_order(name):
+    consumer, _, interval = name.rpartition('.')
+    rank = INTERVAL_ORDER.index(interval) if interval in INTERVAL_ORDER else len(INTERVAL_ORDER)
+    return consumer, rank, interval
+
+
+class LatencyTracer:
+    """
+    Collects per-stage latencies of sampled packets in rolling windows.
+
+    Stamps may come from any thread, e.g. the server pacing thread, the
+    client thread and the GUI thread; only sampled packets and the
+    per-frame consumer marks take the lock.
+    """
+
+    def __init__(self, sample_interval=16, history=1000, max_pending=1024):
+        """
+        Parameters:
+        - sample_interval (int): Trace every sample_interval-th packet.
+        - history (int): Number of latest values kept per interval.
+        - max_pending (int): Number of sampled packets kept per stage queue
+          until they complete. Older ones are dropped, e.g. packets lost by
+          the server or not shown by a hidden view.
+        """
+        self.sample_interval = sample_interval
+        self.history = history
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Discard all pending packets and collected latencies"""
+        with self.lock:
+            self.in_flight = {}  # sequence -> {stage: time} until buffered
+            self.consumers = {}  # consumer -> (buffered, processed) deques of stamp dicts
+            self.intervals = {}  # interval name -> deque of latencies in seconds
+
+    def sampled(self, first, count=1):
+        """
+        Sequence numbers of the traced packets among count consecutive packets.
+
+        Parameters:
+        - first (int): Sequence number of the first packet.
+        - count (int): Number of packets.
+
+        Returns:
+        - range: Traced sequence numbers, usually empty.
+        """
+        start = -(-first // self.sample_interval) * self.sample_interval
+        return range(start, first + count, self.sample_interval)
+
+    def stamp(self, sequence, stage, timestamp=None):
+        """
+        Stamp a packet at a stage, ignored if the packet is not traced.
+
+        Parameters:
+        - sequence (int): Sequence number of the packet, None if unknown.
+        - stage (str): 'scheduled', 'send' or 'receive'.
+        - timestamp (float): perf_counter time, defaults to now.
+        """
+        if sequence is None or sequence % self.sample_interval:
+            return
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self.lock:
+            record = self.in_flight.get(sequence)
+            if record is None:
+                if len(self.in_flight) >= self.max_pending:
+                    del self.in_flight[next(iter(self.in_flight))]
+                record = self.in_flight[sequence] = {}
+            record[stage] = timestamp
+
+    def buffered(self, sequence):
+        """
+        Stamp a packet as written to the buffers and hand it to the consumers.
+
+        Parameters:
+        - sequence (int): Sequence number of the packet, None if unknown.
+        """
+        if sequence is None or sequence % self.sample_interval:
+            return
+        timestamp = time.perf_counter()
+        with self.lock:
+            record = self.in_flight.pop(sequence, {})
+            record['buffer'] = timestamp
+            for name, start, end in PACKET_INTERVALS:
+                if start in record and end in record:
+                    self._add(name, record[end] - record[start])
+            for buffered, _ in self.consumers.values():
+                buffered.append(dict(record))
+
+    def mark(self, consumer, stage):
+        """
+        Mark all pending packets of a consumer as processed or rendered.
+
+        Parameters:
+        - consumer (str): Name of the display path, e.g. 'live'.
+        - stage (str): 'process' after its data was processed, or 'render'
+          after a frame was drawn. Rendering completes the packets processed before.
+        """
+        timestamp = time.perf_counter()
+        with self.lock:
+            queues = self.consumers.get(consumer)
+            if queues is None:
+                queues = self.consumers[consumer] = (
+                    deque(maxlen=self.max_pending), deque(maxlen=self.max_pending)
+                )
+            buffered, processed = queues
+            if stage == 'process':
+                while buffered:
+                    record = buffered.popleft()
+                    record['process'] = timestamp
+                    processed.append(record)
+                return
+
+            while processed:
+                record = processed.popleft()
+                self._add(f"{consumer}.process", record['process'] - record['buffer'])
+                self._add(f"{consumer}.render", timestamp - record['process'])
+                # Unpaced streams have no schedule, their total starts at the send
+                start = record.get('scheduled', record.get('send'))
+                if start is not None:
+                    self._add(f"{consumer}.total", timestamp - start)
+
+    def record(self, name, seconds):
+        """
+        Add a duration that is not tied to a packet, e.g. the time a draw took.
+
+        Parameters:
+        - name (str): Interval name, e.g. 'live.draw'.
+        - seconds (float): Duration in seconds.
+        """
+        with self.lock:
+            self._add(name, seconds)
+
+    def _add(self, name, seconds):
+        values = self.intervals.get(name)
+        if values is None:
+            values = self.intervals[name] = deque(maxlen=self.history)
+        values.append(seconds)
+
+    def stats(self):
+        """
+        Statistics of the rolling window of every interval.
+
+        Returns:
+        - dict: Interval name -> count and mean, 50th, 99th percentile and
+          maximum in ms. Packet intervals come first, then those of each
+          consumer in stage order.
+        """
+        with self.lock:
+            snapshot = {name: np.array(self.intervals[name])
+                        for name in sorted(self.intervals, key=_interval_order)}
+        stats = {}
+        for name, values in snapshot.items():
+            values_ms = values * 1000
+            p50, p99 = np.percentile(values_ms, [50, 99])
+            stats[name] = {
+                'count': len(values_ms),
+                'mean_ms': float(values_ms.mean()),
+                'p50_ms': float(p50),
+                'p99_ms': float(p99),
+                'max_ms': float(values_ms.max()),
+            }
+        return stats
+
+    def histogram(self, name, bins=20, range_ms=None):
+        """
+        Histogram of the rolling window of one interval.
+
+        Parameters:
+        - name (str): Interval name, e.g. 'transfer' or 'live.total'.
+        - bins (int | sequence): Number of bins or bin edges in ms.
+        - range_ms (tuple): Lower and upper edge in ms, defaults to the value range.
+
+        Returns:
+        - tuple(np.ndarray, np.ndarray): Counts and bin edges in ms.
+        """
+        with self.lock:
+            values = np.array(self.intervals.get(name, ()))
+        return np.histogram(values * 1000, bins=bins, range=range_ms)
@@ -4,8 +4,9 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSpinBox,
     QButtonGroup, QSizePolicy, QSpacerItem
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 import numpy as np
+import time
 
 
 class LivePlotWidget(QWidget):
@@ -17,19 +18,42 @@ class LivePlotWidget(QWidget):
     - A start/stop toggle button
     - A channel selector (1-32)
     - Signal mode buttons: Raw, Filter, RMS, Envelope
+    - An overview toggle showing all channels as stacked traces
     """
 
-    def __init__(self, time_window_size=5):
+    # Emitted after every draw of the canvas, with the time the draw took in seconds
+    frame_drawn = pyqtSignal(float)
+
+    def __init__(self, time_window_size=5, decimate=True):
         """
         Initialize the LivePlotWidget.
 
         Sets up:
         - VisPy canvas for plotting, incl. y-axis and title on a grid layout
         - Toolbar with controls for starting/stopping, channel selection, and signal modes
+
+        Parameters:
+        - time_window_size (float): Length of the live window in seconds.
+        - decimate (bool): Reduce the window to the minimum and maximum of
+          each pixel column before it is drawn.
         """
         super().__init__()
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.channel = 0  # Default channel
+        self.decimate = decimate
+        self.time_window_size = time_window_size
+        self.overview = False
+
+        # Persistent (x, y) vertex buffer of the line. The x column is only
+        # rebuilt when the time axis or the decimation layout changes.
+        self.vertices = np.zeros((1, 2), dtype=np.float32)
+        self.vertex_time_points = None
+        self.bin_size = None  # samples per pixel column if decimating
+
+        # Same for the overview, which draws all channels as one line visual
+        self.overview_vertices = np.zeros((1, 2), dtype=np.float32)
+        self.overview_layout = None  # (time points, channels, width, decimate)
+        self.overview_bin_size = None
 
         # === Main layout ===
         main_layout = QHBoxLayout()
@@ -38,6 +62,10 @@ class LivePlotWidget(QWidget):
         # === VisPy canvas ===
         self.canvas = scene.SceneCanvas(keys='interactive')
         main_layout.addWidget(self.canvas.native, stretch=6)
+        # Time every draw, from before the scene is drawn until the commands are flushed
+        self.draw_start = None
+        self.canvas.events.draw.connect(self.on_draw_start, position='first')
+        self.canvas.events.draw.connect(self.on_draw_end, position='last')
         
         # === Grid layout on canvas ===
         grid = self.canvas.central_widget.add_grid(margin=0)
@@ -90,6 +118,10 @@ class LivePlotWidget(QWidget):
         self.line = scene.Line(np.array([[0, 0]]), parent=self.view.scene, width=2)
         self.view.camera.set_range(x=(0, time_window_size), y=(-50000, 50000)) #TODO dynamic range
 
+        # === Overview plot, all channels in a single batched line ===
+        self.overview_line = scene.Line(np.zeros((2, 2)), parent=self.view.scene, width=1)
+        self.overview_line.visible = False
+
         # === Toolbar layout ===
         button_layout = QVBoxLayout()
 
@@ -174,6 +206,14 @@ class LivePlotWidget(QWidget):
             """)
             self.mode_button_group.addButton(btn)
 
+        # === Overview toggle, independent of the signal mode ===
+        self.overview_button = QPushButton("All Channels")
+        self.overview_button.setCheckable(True)
+        self.overview_button.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+        self.overview_button.setMinimumWidth(160)
+        self.overview_button.setStyleSheet(self.raw_button.styleSheet())
+        self.overview_button.toggled.connect(self.set_overview)
+
         # === Wrap toolbar with white border ===
         toolbar_frame = QWidget()
         toolbar_frame.setStyleSheet("""
@@ -190,6 +230,7 @@ class LivePlotWidget(QWidget):
         toolbar_layout.addWidget(self.filter_button)
         toolbar_layout.addWidget(self.rms_button)
         toolbar_layout.addWidget(self.envelope_button)
+        toolbar_layout.addWidget(self.overview_button)
         toolbar_layout.setAlignment(Qt.AlignTop)
         toolbar_layout.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
         toolbar_frame.setLayout(toolbar_layout)
@@ -198,18 +239,159 @@ class LivePlotWidget(QWidget):
         # === Add toolbar to main layout ===
         main_layout.addLayout(button_layout, stretch=1)
 
+    def on_draw_start(self, event):
+        self.draw_start = time.perf_counter()
+
+    def on_draw_end(self, event):
+        """
+        Report a finished draw of the canvas.
+        """
+        if self.draw_start is not None:
+            self.frame_drawn.emit(time.perf_counter() - self.draw_start)
+            self.draw_start = None
+
+    def set_decimation(self, enabled):
+        """
+        Enable or disable per-pixel min/max decimation of the live window.
+
+        Parameters:
+        - enabled (bool): True to draw the min/max of each pixel column.
+        """
+        self.decimate = enabled
+        self.vertex_time_points = None
+
+    def plot_width(self):
+        """
+        Width of the canvas in pixels, an upper bound of the plot view width
+        that is valid before the grid is laid out on the first draw.
+        """
+        return max(1, int(self.canvas.size[0]))
+
+    def update_vertex_layout(self, time_points):
+        """
+        Rebuild the x column of the vertex buffer for a new time axis,
+        plot width or decimation setting.
+
+        Parameters:
+        - time_points (np.ndarray): 1D array of time stamps.
+        """
+        num_samples = len(time_points)
+        width = self.plot_width()
+        if self.decimate and num_samples > 2 * width:
+            # Bins of equal size, one per pixel column; each bin is drawn as
+            # a vertical segment from its minimum to its maximum
+            self.bin_size = -(-num_samples // width)
+            self.vertices = np.empty((2 * _num_bins(num_samples, self.bin_size), 2), dtype=np.float32)
+            self.vertices[:, 0] = _bin_centers(time_points, self.bin_size)
+        else:
+            self.bin_size = None
+            self.vertices = np.empty((num_samples, 2), dtype=np.float32)
+            self.vertices[:, 0] = time_points
+        self.vertex_time_points = time_points
+        self.vertex_width = width
+
     def update_data(self, time_points, data):
         """
         Update the live plot with new signal data.
 
+        Only the y column of the persistent vertex buffer is written.
+
         Parameters:
         - time_points (np.ndarray): 1D array of time stamps.
         - data (np.ndarray): 1D array of signal values.
         """
         self.live_data_time_points = time_points
         self.live_signal = data
-        line_data = np.column_stack((time_points, data))  # Combine into (x, y)
-        self.line.set_data(line_data)
+        if (time_points is not self.vertex_time_points
+                or (self.decimate and self.plot_width() != self.vertex_width)):
+            self.update_vertex_layout(time_points)
+
+        if self.bin_size is None:
+            self.vertices[:, 1] = data
+        else:
+            _min_max_bins(
+                data[np.newaxis], self.bin_size,
+                self.vertices[0::2, 1][np.newaxis], self.vertices[1::2, 1][np.newaxis]
+            )
+        self.line.set_data(self.vertices)
+        self.canvas.native.update()
+
+    def set_overview(self, enabled):
+        """
+        Switch between the single channel plot and the all-channel overview.
+
+        Parameters:
+        - enabled (bool): True to show all channels stacked.
+        """
+        self.overview = enabled
+        self.line.visible = not enabled
+        self.overview_line.visible = enabled
+        self.channel_selector.setEnabled(not enabled)
+        if enabled:
+            num_channels = self.overview_layout[1] if self.overview_layout else self.channel_selector.maximum()
+            self.view.camera.set_range(x=(0, self.time_window_size), y=(-1, num_channels))
+        else:
+            self.view.camera.set_range(x=(0, self.time_window_size), y=(-50000, 50000))
+        self.canvas.native.update()
+
+    def update_overview_layout(self, time_points, num_channels):
+        """
+        Rebuild the x column and connectivity of the overview vertex buffer.
+
+        Every channel is a run of vertices with the same x values; the runs
+        are not connected to each other, so one line visual draws all traces.
+
+        Parameters:
+        - time_points (np.ndarray): 1D array of time stamps.
+        - num_channels (int): Number of stacked channels.
+        """
+        num_samples = len(time_points)
+        width = self.plot_width()
+        if self.decimate and num_samples > 2 * width:
+            self.overview_bin_size = -(-num_samples // width)
+            x = _bin_centers(time_points, self.overview_bin_size)
+        else:
+            self.overview_bin_size = None
+            x = time_points
+        points = len(x)
+        self.overview_vertices = np.empty((num_channels * points, 2), dtype=np.float32)
+        self.overview_vertices[:, 0] = np.tile(x, num_channels)
+        connect = np.ones(num_channels * points - 1, dtype=bool)
+        connect[points - 1::points] = False
+        self.overview_line.set_data(pos=self.overview_vertices, connect=connect)
+        # Channel 1 on top
+        self.overview_offsets = np.arange(num_channels - 1, -1, -1, dtype=np.float32)[:, np.newaxis]
+        self.overview_layout = (time_points, num_channels, width, self.decimate)
+
+    def update_overview(self, time_points, data):
+        """
+        Update the overview with new data of all channels.
+
+        All channels share one scale, so a flat or noisy electrode stands out
+        against the others.
+
+        Parameters:
+        - time_points (np.ndarray): 1D array of time stamps.
+        - data (np.ndarray): Signal of shape (channels, samples).
+        """
+        num_channels = data.shape[0]
+        if (self.overview_layout is None
+                or time_points is not self.overview_layout[0]
+                or (num_channels, self.plot_width(), self.decimate) != self.overview_layout[1:]):
+            self.update_overview_layout(time_points, num_channels)
+
+        # View of the y column as (channels, points per channel)
+        traces = self.overview_vertices[:, 1].reshape(num_channels, -1)
+        if self.overview_bin_size is None:
+            traces[:] = data
+        else:
+            _min_max_bins(data, self.overview_bin_size, traces[:, 0::2], traces[:, 1::2])
+
+        # Typical channel peak fills a little less than half the channel spacing
+        peak = np.median(np.abs(traces).max(axis=1))
+        traces *= 0.45 / peak if peak > 0 else 1.0
+        traces += self.overview_offsets
+        self.overview_line.set_data(pos=self.overview_vertices)
         self.canvas.native.update()
 
     def change_button_style(self):
@@ -227,3 +409,53 @@ class LivePlotWidget(QWidget):
         self.start_stop_button.style().unpolish(self.start_stop_button)
         self.start_stop_button.style().polish(self.start_stop_button)
 
+
+def _num_bins(num_samples, bin_size):
+    """
+    Number of bins of bin_size samples covering num_samples, the last may be partial.
+    """
+    return -(-num_samples // bin_size)
+
+
+def _bin_centers(time_points, bin_size):
+    """
+    Center time of each bin, repeated for its minimum and maximum vertex.
+
+    Parameters:
+    - time_points (np.ndarray): 1D array of time stamps.
+    - bin_size (int): Number of samples per bin.
+
+    Returns:
+    - np.ndarray: 1D array of two x values per bin.
+    """
+    starts = np.arange(0, len(time_points), bin_size)
+    stops = np.minimum(starts + bin_size, len(time_points))
+    return np.repeat((time_points[starts] + time_points[stops - 1]) / 2, 2)
+
+
+def _min_max_bins(data, bin_size, mins, maxs):
+    """
+    Minimum and maximum of consecutive bins of samples, for every channel.
+
+    Parameters:
+    - data (np.ndarray): Signal of shape (channels, samples).
+    - bin_size (int): Number of samples per bin, the last bin may be partial.
+    - mins (np.ndarray): Output of shape (channels, bins), may be a strided view.
+    - maxs (np.ndarray): Output of shape (channels, bins), may be a strided view.
+    """
+    num_channels, num_samples = data.shape
+    num_full = num_samples // bin_size
+    bins = data[:, :num_full * bin_size].reshape(num_channels, num_full, bin_size)
+    if bin_size < 64:
+        # Transposed copy, so the reductions run over contiguous rows
+        # instead of many short bins
+        bins = np.ascontiguousarray(bins.transpose(0, 2, 1))
+        np.min(bins, axis=1, out=mins[:, :num_full])
+        np.max(bins, axis=1, out=maxs[:, :num_full])
+    else:
+        np.min(bins, axis=2, out=mins[:, :num_full])
+        np.max(bins, axis=2, out=maxs[:, :num_full])
+    if num_full < mins.shape[1]:
+        tail = data[:, num_full * bin_size:]
+        mins[:, num_full] = tail.min(axis=1)
+        maxs[:, num_full] = tail.max(axis=1)
@@ -1,5 +1,7 @@
 from PyQt5.QtCore import QTimer
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QFrame, QSizePolicy, QSplitter)
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QFrame, QSizePolicy, QSplitter,
+                             QLabel, QShortcut)
+from PyQt5.QtGui import QKeySequence
 import time
 from PyQt5.QtCore import QTimer, Qt
 
@@ -16,6 +18,7 @@ class MainView(QMainWindow):
     - A connection control widget (connect/disconnect)
     - A live signal visualization widget with processing options
     - A recording widget with processing options, export button
+    - An optional latency overlay (Ctrl+T) showing the traced stage latencies
 
     It links UI components to the ViewModel and sets up all necessary signal-slot connections.
     """
@@ -67,6 +70,9 @@ class MainView(QMainWindow):
 
         # Connect data update signal
         view_model.live_data_updated.connect(live_plot_widget.update_data)
+        view_model.live_overview_updated.connect(live_plot_widget.update_overview)
+        live_plot_widget.overview_button.toggled.connect(self.view_model.set_live_overview)
+        live_plot_widget.frame_drawn.connect(view_model.live_frame_drawn)
 
         # === Horizontal Separator ===
         separator = QFrame()
@@ -88,6 +94,10 @@ class MainView(QMainWindow):
 
         # Connect recorded data update and clear button
         view_model.recorded_data_updated.connect(self.recording_widget.update_data)
+        self.recording_widget.visible_range_changed.connect(view_model.set_recording_view_range)
+        self.recording_widget.plot_width_changed.connect(view_model.set_recording_view_width)
+        self.recording_widget.shown_changed.connect(view_model.set_recording_shown)
+        self.recording_widget.frame_drawn.connect(view_model.recording_frame_drawn)
         self.recording_widget.clear_button.clicked.connect(self.clear_recording_and_plot)
         
         # Splitter to scale live plot and recording plot
@@ -97,6 +107,67 @@ class MainView(QMainWindow):
         splitter.setSizes([1, 1])  # Initial 50/50 split
         central_layout.addWidget(splitter, stretch=1)
 
+        # === Latency overlay, floating in the top right corner ===
+        self.latency_label = QLabel(central_widget)
+        self.latency_label.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 180); color: #8f8; padding: 6px;"
+            "font-family: monospace; font-size: 11px;"
+        )
+        self.latency_label.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.latency_label.hide()
+        self.latency_timer = QTimer()
+        self.latency_timer.timeout.connect(self.update_latency_overlay)
+        QShortcut(QKeySequence("Ctrl+T"), self, activated=self.toggle_latency_overlay)
+
+    def set_latency_overlay(self, enabled):
+        """
+        Enable latency tracing and show its statistics, or disable both.
+
+        Parameters:
+        - enabled (bool): True to trace and show the overlay.
+        """
+        self.view_model.set_tracing(enabled)
+        if enabled:
+            self.update_latency_overlay()
+            self.latency_label.show()
+            self.latency_label.raise_()
+            self.latency_timer.start(500)
+        else:
+            self.latency_timer.stop()
+            self.latency_label.hide()
+
+    def toggle_latency_overlay(self):
+        self.set_latency_overlay(not self.latency_timer.isActive())
+
+    def update_latency_overlay(self):
+        """
+        Show the rolling latency statistics of all traced stages.
+        """
+        lines = [f"{'stage':<18}{'p50':>8}{'p99':>8}{'max':>8}  ms"]
+        for name, stats in self.view_model.latency_stats().items():
+            lines.append(f"{name:<18}{stats['p50_ms']:8.2f}{stats['p99_ms']:8.2f}{stats['max_ms']:8.2f}")
+        if len(lines) == 1:
+            lines.append("waiting for traced packets...")
+        self.latency_label.setText("\n".join(lines))
+        self.latency_label.adjustSize()
+        self.position_latency_overlay()
+
+    def position_latency_overlay(self):
+        parent = self.latency_label.parentWidget()
+        self.latency_label.move(parent.width() - self.latency_label.width() - 20, 20)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.position_latency_overlay()
+
+    def closeEvent(self, event):
+        """
+        Stop the view model's processing workers before the window goes away.
+        """
+        self.latency_timer.stop()
+        self.view_model.close()
+        super().closeEvent(event)
+
     def clear_recording_and_plot(self):
         """
         Clear both the ViewModel's recording data and the associated plot.
@@ -108,19 +179,20 @@ class MainView(QMainWindow):
         """
         Toggle the data reception state for live signal processing.
 
-        Starts or stops the ViewModel's timer and updates the recording flag.
-        Toggles the visibility of the recording toolbar.
+        Updates the recording flag; the ViewModel's render timers only redraw
+        when new data arrives. Toggles the visibility of the recording toolbar.
         """
         if self.view_model.is_receiving:
             self.view_model.is_receiving = False
             self.signal_processor.is_recording = False
-            self.view_model.timer.stop()
             self.recording_widget.toggle_toolbar_visible(True)
         else:
             self.view_model.is_receiving = True
             self.signal_processor.is_recording = True
-            self.view_model.timer.start(int(self.view_model.sleep_time))
             self.recording_widget.toggle_toolbar_visible(False)
+            # Zooming is only possible while stopped, follow the recording again
+            self.recording_widget.follow_recording()
+            self.view_model.follow_recording()
 
     def handle_connection_toggled(self, connected: bool):
         """
@@ -1,3 +1,4 @@
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import (
     FigureCanvasQTAgg as FigureCanvas,
@@ -6,9 +7,9 @@ from matplotlib.backends.backend_qt5agg import (
 from matplotlib.figure import Figure
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSpinBox, QSizePolicy, QButtonGroup , QSpacerItem
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSpinBox, QSizePolicy, QButtonGroup
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 
 class RecordingPlotWidget(QWidget):
     """
@@ -23,6 +24,15 @@ class RecordingPlotWidget(QWidget):
         - Clearing the recorded data
     """
 
+    # Emitted when the user zooms or pans, with the visible time range in seconds
+    visible_range_changed = pyqtSignal(float, float)
+    # Emitted when the plot area is resized, with its width in pixels
+    plot_width_changed = pyqtSignal(int)
+    # Emitted when the plot is shown or hidden (including a collapsed splitter pane)
+    shown_changed = pyqtSignal(bool)
+    # Emitted after every draw of the canvas
+    frame_drawn = pyqtSignal()
+
     def __init__(self, view_model):
         """
         Initialize the recording plot widget.
@@ -34,6 +44,9 @@ class RecordingPlotWidget(QWidget):
         self.view_model = view_model
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.channel = 0
+        self.follow = True  # show the whole recording until the user zooms
+        self.updating = False  # ignore axis limit changes made by the widget itself
+        self.shown = False
 
         # === Main layout ===
         main_layout = QHBoxLayout()
@@ -49,12 +62,20 @@ class RecordingPlotWidget(QWidget):
             self.figure = Figure(constrained_layout=True)
             self.ax = self.figure.add_subplot(111)
             self.ax.set_facecolor("black")
+            self.ax.set_title("EMG Recording", color='white')
             self.ax.set_xlabel("Time (s)", color='white')
             self.ax.set_ylabel("EMG Signal", color='white')
             self.ax.tick_params(colors='white')
-            self.ax.grid(True, color='white', linestyle='--', linewidth=0.5)
+            self.ax.grid(True, color='white', linestyle='-', linewidth=0.1)
+            self.ax.set_xlim(left=0, right=1)
+            self.ax.margins(x=0)
+            # Persistent line, updates only replace its data
+            self.line, = self.ax.plot([], [], color='white', linewidth=1)
 
         self.canvas = FigureCanvas(self.figure)
+        self.canvas.mpl_connect('resize_event', self.on_resize)
+        self.canvas.mpl_connect('draw_event', lambda event: self.frame_drawn.emit())
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
         self.toolbar = NavigationToolbar(self.canvas, self)
         self.toolbar.setStyleSheet("""
             QToolBar {
@@ -203,46 +224,83 @@ class RecordingPlotWidget(QWidget):
         """
         self.toolbar.setVisible(visible)
 
+    def follow_recording(self):
+        """
+        Show the whole recording again and follow it as it grows.
+        """
+        self.follow = True
+
+    def on_resize(self, event):
+        """
+        Report the new width of the plot area.
+        """
+        self.plot_width_changed.emit(int(self.ax.bbox.width))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_shown()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_shown()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_shown()
+
+    def update_shown(self):
+        """
+        Report whether the plot is on screen, so updates can be paused while it is not.
+        """
+        shown = self.isVisible() and self.width() > 0 and self.height() > 0
+        if shown != self.shown:
+            self.shown = shown
+            self.shown_changed.emit(shown)
+
+    def on_xlim_changed(self, ax):
+        """
+        Report the visible time range after the user zoomed or panned.
+        """
+        if self.updating:
+            return
+        self.follow = False
+        x_min, x_max = ax.get_xlim()
+        self.visible_range_changed.emit(x_min, x_max)
+
     def clear_plot(self):
         """
-        Clear the plot area and redraw an empty chart.
+        Remove the plotted signal and reset the axes.
         """
-        self.ax.clear()
-        # self.ax.plot([0, 1], [0, 0] ,color='white', linewidth=1)
-        self.ax.set_facecolor("black")
-        self.ax.set_title("EMG Recording", color='white')
-        self.ax.set_xlabel("Time (s)", color='white')
-        self.ax.set_ylabel("EMG Signal", color='white')
-        self.ax.tick_params(colors='white')
-        self.ax.grid(True, color='white', linestyle='-', linewidth=0.1)
-        # self.ax.set_xlim(left=0 , right= 1)
-        # self.ax.margins(x=0)
-        self.canvas.draw()
+        self.update_data(np.zeros(0), np.zeros(0))
 
     def update_data(self, time_axis, data):
         """
         Update the plot with new recorded signal data.
 
+        Only the data and limits of the persistent line are changed,
+        the canvas is redrawn once the event loop is idle.
+
         Parameters:
         - time_axis (np.ndarray): 1D array of time values.
-        - data (np.ndarray): 1D array of signal values.
+        - data (np.ndarray): 1D array of signal values, e.g. a min/max summary
+          of the visible range.
         """
         self.time_axis = time_axis
         self.data = data
 
-        self.ax.clear()
-        self.ax.plot(time_axis, data, color='white', linewidth=1)
-        self.ax.set_facecolor("black")
-        self.ax.set_title("EMG Recording", color='white')
-        self.ax.set_xlabel("Time (s)", color='white')
-        self.ax.set_ylabel("EMG Signal", color='white')
-        self.ax.tick_params(colors='white')
-        self.ax.grid(True, color='white', linestyle='-', linewidth=0.1)
-        if len(time_axis) > 1 and self.time_axis[-1] > 0:
-            self.ax.set_xlim(left=0, right=self.time_axis[-1])
+        self.updating = True
+        self.line.set_data(time_axis, data)
+        if self.follow:
+            if len(time_axis) > 1 and time_axis[-1] > 0:
+                self.ax.set_xlim(left=0, right=time_axis[-1])
+            else:
+                self.ax.set_xlim(left=0, right=1)
+        if len(data) > 0:
+            low, high = float(np.min(data)), float(np.max(data))
+            margin = 0.05 * (high - low) if high > low else 1.0
+            self.ax.set_ylim(low - margin, high + margin)
         else:
-            self.ax.set_xlim(left=0, right=1)
-        self.ax.margins(x=0)
+            self.ax.set_ylim(-1, 1)
+        self.updating = False
 
-        self.canvas.draw()
-        self.canvas.flush_events()
+        self.canvas.draw_idle()
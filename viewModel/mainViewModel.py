@@ -1,8 +1,16 @@
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer 
-from PyQt5.QtWidgets import QFileDialog, QMessageBox
-from scipy.signal import hilbert, butter, filtfilt
+from PyQt5.QtWidgets import QFileDialog, QMessageBox, QInputDialog, QProgressDialog
 from service.signal_processor import SignalProcessor
-import csv
+from service.export import EXPORT_FILTERS, ExportJob, parse_channels
+from service.processing_worker import LatestWinsWorker
+from service.dsp import (
+    design_filter, process_block, StreamingFilter, RunningRMS, StreamingEnvelope,
+    LiveStream, BlockRecordingStream, RecordingResultCache
+)
+import functools
+import os
+import threading
+import time
 import numpy as np
 
 class MainViewModel(QObject):
@@ -12,46 +20,106 @@ class MainViewModel(QObject):
 
     Responsibilities:
     - Handles live and recorded EMG data updates
-    - Applies signal processing (RMS, envelope, filter)
+    - Applies signal processing (RMS, envelope, filter) on worker threads,
+      one per view, emitting only the newest valid result
     - Coordinates plotting updates and recording logic
     - Manages export functionality
     """
 
     # Updated signals, emitted when data changes
     live_data_updated = pyqtSignal(np.ndarray, np.ndarray)
+    live_overview_updated = pyqtSignal(np.ndarray, np.ndarray)  # all channels
     recorded_data_updated = pyqtSignal(np.ndarray, np.ndarray)
-
-    def __init__(self):
+    # Emitted from the export worker thread, delivered to the GUI thread
+    export_progress = pyqtSignal(float)
+    export_finished = pyqtSignal(object)
+    # Emitted from the processing workers with a ProcessingResult
+    live_processed = pyqtSignal(object)
+    recording_processed = pyqtSignal(object)
+
+    def __init__(self, recording_dir=None, source_file=None, use_asyncio=False, speed=1.0):
         """
         Initialize the MainViewModel.
 
         Sets up:
         - Signal processor and sampling config
         - Live/recorded data containers
-        - Default processing modes and timers
+        - Default processing modes and render timers
+
+        Parameters:
+        - recording_dir (str): Optional directory for memory-mapped recordings,
+          passed on to the SignalProcessor.
+        - source_file (str): Optional memory-mapped source file for the server,
+          passed on to the SignalProcessor.
+        - use_asyncio (bool): Use the asyncio server and client, passed on to the SignalProcessor.
+        - speed (float): Replay speed of the server, None for unpaced, passed on to the SignalProcessor.
         """
         super().__init__()
 
-        self.signal_processor = SignalProcessor()
+        self.signal_processor = SignalProcessor(
+            recording_dir=recording_dir, source_file=source_file, use_asyncio=use_asyncio,
+            speed=speed
+        )
         self.sampling_rate = self.signal_processor.sampling_rate
         self.sleep_time = self.signal_processor.sleep_time
 
         # Live signal state
-        self.live_data = self.signal_processor.live_signal
         self.live_window_size = self.signal_processor.live_window_size
         self.live_data_time_points = np.linspace(0, self.live_window_size / self.sampling_rate, self.live_window_size)
-        self.processed_live_data = self.live_data
-
-        # Recorded signal state
-        self.recorded_data = self.live_data.copy()
-        self.processed_recorded_data = self.recorded_data
+        self.processed_live_data = self.signal_processor.live_signal  # latest result of the live worker
 
         # Processing settings
         self.live_processing_mode = 'raw'
+        self.live_overview = False  # process and emit all live channels
         self.recording_processing_mode = 'raw'
         self.rms_window_size = 20  # 100 ms at 2000 Hz
+        self.filter_order = 4
         self.filter_band = (20, 450)  # Bandpass filter range in Hz
 
+        # Streaming processors for the live view, keyed by mode.
+        # They only process samples that arrived since the previous update.
+        live_buffer = self.signal_processor.live_signal_buffer
+        num_channels = self.signal_processor.num_channels
+        self.live_streams = {
+            'filter': LiveStream(
+                live_buffer,
+                StreamingFilter(
+                    design_filter(self.filter_order, self.filter_band, self.sampling_rate),
+                    channels=num_channels
+                )
+            ),
+            'rms': LiveStream(
+                live_buffer,
+                RunningRMS(self.rms_window_size, channels=num_channels)
+            ),
+            'envelope': LiveStream(
+                live_buffer,
+                StreamingEnvelope(self.sampling_rate, channels=num_channels)
+            ),
+        }
+
+        # Processed recording results, keyed by (channel, mode, parameters).
+        # Cached results are extended with newly recorded samples only.
+        self.recording_cache = RecordingResultCache(self.signal_processor.recording)
+        self.recording_stream_factories = {
+            'rms': lambda channels: BlockRecordingStream(
+                self.signal_processor.recording, 'rms', self.sampling_rate,
+                channels=channels, rms_window_size=self.rms_window_size
+            ),
+            'envelope': lambda channels: BlockRecordingStream(
+                self.signal_processor.recording, 'envelope', self.sampling_rate,
+                channels=channels
+            ),
+            'filter': lambda channels: BlockRecordingStream(
+                self.signal_processor.recording, 'filter', self.sampling_rate, channels=channels,
+                filter_order=self.filter_order, filter_band=self.filter_band
+            ),
+        }
+
+        # Visible part of the recording plot, None follows the whole recording
+        self.recording_view_range = None  # (start, stop) in seconds
+        self.recording_view_width = 1000  # plot width in pixels
+
         # Channel selection (0-indexed)
         self.live_channel = 0
         self.recording_channel = 0
@@ -59,11 +127,174 @@ class MainViewModel(QObject):
         # Reception flag
         self.is_receiving = False
 
-        # Timers for real-time updates
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_live_data)
-        self.timer.timeout.connect(self.update_recorded_data)
-        self.timer.start(9)  # Synchronize with tcp server
+        # Background export of the recording
+        self.export_job = None
+        self.export_dialog = None
+        self.export_progress.connect(self.on_export_progress)
+        self.export_finished.connect(self.on_export_finished)
+
+        # Data version of the SignalProcessor requested by each pane
+        self.live_rendered_version = None
+        self.recording_rendered_version = None
+
+        # Processing runs on one worker per pane, so a slow recording mode
+        # does not delay the live view and neither blocks the GUI thread.
+        # Results of requests made before the last settings change (channel,
+        # mode, view range, cleared recording) are dropped when they arrive,
+        # as are results of older data than the one shown.
+        self.live_worker = LatestWinsWorker("live processing", self.live_processed.emit)
+        self.recording_worker = LatestWinsWorker("recording processing", self.recording_processed.emit)
+        self.live_valid_sequence = 0
+        self.recording_valid_sequence = 0
+        self.live_shown_version = -1
+        self.recording_shown_version = -1
+        self.dropped_results = 0
+        # Set by clear_recording, the recording worker clears before its next task
+        self.recording_clear_requested = threading.Event()
+        self.live_processed.connect(self.on_live_processed)
+        self.recording_processed.connect(self.on_recording_processed)
+        # The recording pane is not rendered while it is hidden or collapsed
+        self.recording_shown = True
+
+        # Render timers, independent of the packet rate. Each frame renders
+        # only if new data arrived; packets in between are coalesced.
+        self.live_display_rate = 60  # Hz
+        self.recording_display_rate = 2  # Hz
+        self.live_timer = QTimer()
+        self.live_timer.timeout.connect(self.render_live_data)
+        self.recording_timer = QTimer()
+        self.recording_timer.timeout.connect(self.render_recorded_data)
+        self.set_live_display_rate(self.live_display_rate)
+        self.set_recording_display_rate(self.recording_display_rate)
+
+    def set_live_display_rate(self, rate):
+        """
+        Set how often the live view is redrawn at most.
+
+        Parameters:
+        - rate (float): Display rate in Hz
+        """
+        self.live_display_rate = rate
+        self.live_timer.start(max(1, round(1000 / rate)))
+
+    def set_recording_display_rate(self, rate):
+        """
+        Set how often the recording view is redrawn at most.
+
+        Parameters:
+        - rate (float): Display rate in Hz
+        """
+        self.recording_display_rate = rate
+        self.recording_timer.start(max(1, round(1000 / rate)))
+
+    def render_live_data(self):
+        """
+        Render timer slot, updates the live view if new data arrived since the last frame.
+        """
+        if self.signal_processor.data_version != self.live_rendered_version:
+            self.update_live_data()
+
+    def render_recorded_data(self):
+        """
+        Render timer slot, updates the recording view if new data arrived since the last frame.
+        """
+        if self.recording_shown and self.signal_processor.data_version != self.recording_rendered_version:
+            self.update_recorded_data()
+
+    def set_recording_shown(self, shown):
+        """
+        Pause or resume rendering of the recording view.
+
+        Parameters:
+        - shown (bool): Whether the recording plot is on screen.
+        """
+        self.recording_shown = shown
+        self.render_recorded_data()
+
+    def set_recording_view_range(self, start_time, stop_time):
+        """
+        Set the visible time range of the recording plot, e.g. after zooming.
+
+        Parameters:
+        - start_time (float): Start of the visible range in seconds.
+        - stop_time (float): End of the visible range in seconds.
+        """
+        self.recording_view_range = (start_time, stop_time)
+        self.update_recorded_data(settings_changed=True)
+
+    def follow_recording(self):
+        """
+        Show the whole recording again, following it as it grows.
+        """
+        self.recording_view_range = None
+        self.update_recorded_data(settings_changed=True)
+
+    def set_recording_view_width(self, width):
+        """
+        Set the width of the recording plot, which sets the plotted resolution.
+
+        Parameters:
+        - width (int): Plot width in pixels
+        """
+        self.recording_view_width = max(1, width)
+        self.update_recorded_data(settings_changed=True)
+
+    def set_tracing(self, enabled):
+        """
+        Enable or disable latency tracing of sampled packets up to the drawn frame.
+
+        Parameters:
+        - enabled (bool): True to trace, see service/tracing.py.
+        """
+        self.signal_processor.set_tracing(enabled)
+
+    def latency_stats(self):
+        """
+        Rolling latency statistics of the traced stages.
+
+        Returns:
+        - dict: Interval name -> count and mean, 50th, 99th percentile and maximum in ms.
+        """
+        return self.signal_processor.tracer.stats()
+
+    def latency_histogram(self, name, bins=20, range_ms=None):
+        """
+        Rolling histogram of one traced interval, e.g. 'transfer' or 'live.total'.
+
+        Returns:
+        - tuple(np.ndarray, np.ndarray): Counts and bin edges in ms.
+        """
+        return self.signal_processor.tracer.histogram(name, bins, range_ms)
+
+    def live_frame_drawn(self, seconds):
+        """
+        Slot for drawn live frames, completes the traced packets shown in them.
+
+        Parameters:
+        - seconds (float): Time the draw took.
+        """
+        if self.signal_processor.tracing:
+            self.signal_processor.tracer.record('live.draw', seconds)
+            self.signal_processor.tracer.mark('live', 'render')
+
+    def recording_frame_drawn(self):
+        """
+        Slot for drawn recording frames, completes the traced packets shown in them.
+        """
+        if self.signal_processor.tracing:
+            self.signal_processor.tracer.mark('recording', 'render')
+
+    def trace_processed(self, consumer, start):
+        """
+        Mark the traced packets of a view as processed and record the processing time.
+
+        Parameters:
+        - consumer (str): 'live' or 'recording'.
+        - start (float): perf_counter time the processing started.
+        """
+        tracer = self.signal_processor.tracer
+        tracer.record(f"{consumer}.compute", time.perf_counter() - start)
+        tracer.mark(consumer, 'process')
 
     def set_live_channel(self, channel):
         """
@@ -73,7 +304,7 @@ class MainViewModel(QObject):
         - channel (int): Channel index (1-based)
         """
         self.live_channel = channel - 1
-        self.update_live_data()
+        self.update_live_data(settings_changed=True)
 
     def set_live_processing_mode(self, mode):
         """
@@ -83,7 +314,17 @@ class MainViewModel(QObject):
         - mode (str): 'raw', 'rms', 'envelope', or 'filter'
         """
         self.live_processing_mode = mode
-        self.update_live_data()
+        self.update_live_data(settings_changed=True)
+
+    def set_live_overview(self, enabled):
+        """
+        Switch the live view between the selected channel and all channels.
+
+        Parameters:
+        - enabled (bool): True to emit all channels via live_overview_updated.
+        """
+        self.live_overview = enabled
+        self.update_live_data(settings_changed=True)
 
     def set_recording_channel(self, channel):
         """
@@ -93,7 +334,7 @@ class MainViewModel(QObject):
         - channel (int): Channel index (1-based)
         """
         self.recording_channel = channel - 1
-        self.update_recorded_data()
+        self.update_recorded_data(settings_changed=True)
 
     def set_recording_processing_mode(self, mode):
         """
@@ -103,18 +344,50 @@ class MainViewModel(QObject):
         - mode (str): 'raw', 'rms', 'envelope', or 'filter'
         """
         self.recording_processing_mode = mode
-        self.update_recorded_data()
+        self.update_recorded_data(settings_changed=True)
 
     def clear_recording(self):
         """
         Clear the recorded signal and refresh view.
+
+        The recording is cleared by the recording worker before it runs its
+        next task, so it never changes under a task reading it.
         """
-        self.signal_processor.clear_recording()
-        self.update_recorded_data()
+        self.recording_clear_requested.set()
+        self.update_recorded_data(settings_changed=True)
+
+    def close(self):
+        """
+        Stop the render timers and the processing workers, e.g. when the window closes.
+
+        Waits for running tasks, so no results are delivered afterwards.
+        """
+        self.live_timer.stop()
+        self.recording_timer.stop()
+        self.live_worker.stop()
+        self.recording_worker.stop()
+
+    def process_block(self, data, mode):
+        """
+        Apply the selected signal processing method to many channels at once.
+
+        Parameters:
+        - data (np.ndarray): Input signal of shape (channels, samples)
+        - mode (str): Processing type ('raw', 'rms', etc.)
+
+        Returns:
+        - np.ndarray: Processed signal of shape (channels, samples)
+        """
+        return process_block(
+            data, mode, self.sampling_rate,
+            rms_window_size=self.rms_window_size,
+            filter_order=self.filter_order,
+            filter_band=self.filter_band
+        )
 
     def process_signal(self, data, mode):
         """
-        Apply the selected signal processing method.
+        Apply the selected signal processing method to a single channel.
 
         Parameters:
         - data (np.ndarray): Input 1D signal
@@ -123,124 +396,264 @@ class MainViewModel(QObject):
         Returns:
         - np.ndarray: Processed signal
         """
-        if mode == 'raw':
-            return data
-        elif mode == 'rms':
-            return self.apply_rms(data)
-        elif mode == 'envelope':
-            return self.apply_envelope(data)
-        elif mode == 'filter':
-            return self.apply_filter(data)
-        return data
+        return self.process_block(data[np.newaxis, :], mode)[0]
 
-    def apply_rms(self, data):
+    def export_results(self):
         """
-        Compute the RMS (Root Mean Square) of the signal.
+        Export the recording, processed with the recording mode, in the background.
+
+        Asks for the file (its extension selects the format, see
+        service/export.py) and the channels, then runs an ExportJob on a
+        worker thread behind a progress dialog with a cancel button.
+        Reports success or failure when the job has ended.
+        """
+        if self.export_job is not None and not self.export_job.done.is_set():
+            QMessageBox.warning(None, "Export running", "Wait for the running export to finish or cancel it.")
+            return
+        if len(self.signal_processor.recording) == 0:
+            QMessageBox.warning(None, "Export Failed", "No data to export.")
+            return
+
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            None, "Export data", "", ";;".join(EXPORT_FILTERS)
+        )
+        if not file_path:
+            return  # Cancelled by user
+        if not os.path.splitext(file_path)[1]:
+            # Extension of the selected filter, e.g. "NumPy Array (*.npy)"
+            file_path += selected_filter[selected_filter.rindex('*') + 1:-1]
+
+        num_channels = self.signal_processor.num_channels
+        text, ok = QInputDialog.getItem(
+            None, "Export channels", "Channels (e.g. all, 5 or 1-8, 12):",
+            ["all", str(self.recording_channel + 1)], 0, True
+        )
+        if not ok:
+            return
+        try:
+            channels = parse_channels(text, num_channels)
+            self.export_job = ExportJob(
+                self.signal_processor.recording, file_path, self.sampling_rate,
+                channels=channels, mode=self.recording_processing_mode,
+                rms_window_size=self.rms_window_size,
+                filter_order=self.filter_order, filter_band=self.filter_band,
+                progress=self.export_progress.emit, finished=self.export_finished.emit
+            )
+        except ValueError as e:
+            QMessageBox.critical(None, "Export failed", str(e))
+            return
+
+        self.export_dialog = QProgressDialog(f"Exporting to {file_path}...", "Cancel", 0, 1000)
+        self.export_dialog.setWindowTitle("Export")
+        self.export_dialog.setMinimumDuration(300)
+        self.export_dialog.canceled.connect(self.export_job.cancel)
+        self.export_job.start()
+
+    def on_export_progress(self, fraction):
+        """
+        Slot for the progress of the running export.
 
         Parameters:
-        - data (np.ndarray): Input signal
+        - fraction (float): Completed fraction, 0 to 1.
+        """
+        if self.export_dialog is not None and not self.export_job.cancel_event.is_set():
+            self.export_dialog.setValue(int(fraction * 1000))
 
-        Returns:
-        - np.ndarray: RMS-smoothed signal
+    def on_export_finished(self, job):
         """
-        # TODO why not use ex 4?
-        squared = np.square(data)
-        window = np.ones(self.rms_window_size) / self.rms_window_size
-        return np.sqrt(np.convolve(squared, window, 'same'))
+        Slot for the end of an export, reports its outcome.
 
-    def apply_envelope(self, data):
+        Parameters:
+        - job (ExportJob): The finished job.
         """
-        Compute the envelope of the signal using Hilbert transform.
+        if self.export_dialog is not None:
+            self.export_dialog.reset()
+            self.export_dialog = None
+        if job.error is not None:
+            QMessageBox.critical(None, "Export failed", str(job.error))
+        elif not job.cancelled:
+            QMessageBox.information(None, "Export successful", f"Data saved to: {job.path}")
+
+    def processing_parameters(self, mode):
+        """
+        Get the parameters a processing mode depends on, as a cache key.
 
         Parameters:
-        - data (np.ndarray): Input signal
+        - mode (str): 'raw', 'rms', 'envelope', or 'filter'
 
         Returns:
-        - np.ndarray: Envelope of the signal
+        - tuple: Hashable parameter values.
         """
-        return np.abs(hilbert(data))
+        if mode == 'rms':
+            return (self.rms_window_size,)
+        elif mode == 'envelope':
+            return (self.sampling_rate,)
+        elif mode == 'filter':
+            return (self.filter_order, tuple(self.filter_band), self.sampling_rate)
+        return ()
 
-    def apply_filter(self, data):
+    def update_live_data(self, settings_changed=False):
         """
-        Apply a 4th-order low-pass Butterworth filter.
+        Request an update of the live signal view with current data.
+
+        The processing runs on the live worker; the newest request replaces
+        one that has not started yet. The result is emitted by on_live_processed.
 
         Parameters:
-        - data (np.ndarray): Input signal
+        - settings_changed (bool): True if results of earlier requests are
+          no longer valid, e.g. after selecting another channel.
+        """
+        self.live_rendered_version = self.signal_processor.data_version
+        sequence = self.live_worker.submit(
+            self.live_rendered_version,
+            functools.partial(
+                self.process_live_data,
+                self.live_processing_mode, self.live_channel, self.live_overview
+            )
+        )
+        if settings_changed:
+            self.live_valid_sequence = sequence
 
-        Returns:
-        - np.ndarray: Filtered signal
+    def process_live_data(self, mode, channel, overview):
         """
-        nyquist = 0.5 * self.sampling_rate
-        low = self.filter_band[0] / nyquist
-        high = self.filter_band[1] / nyquist
+        Process the live window, runs on the live worker.
 
-        b, a = butter(4, [low, high], btype='bandpass')
-        return filtfilt(b, a, data)
+        Parameters:
+        - mode (str): 'raw', 'rms', 'envelope', or 'filter'
+        - channel (int): Channel index (0-based), ignored for the overview.
+        - overview (bool): Process all channels.
 
-    def export_results(self):
+        Returns:
+        - tuple(bool, np.ndarray): The overview flag and the processed data,
+          shape (channels, samples) for the overview, (samples,) otherwise.
+        """
+        trace_start = time.perf_counter() if self.signal_processor.tracing else None
+
+        live_stream = self.live_streams.get(mode)
+        if overview:
+            # All channels, for the stacked overview
+            if live_stream is not None:
+                data = live_stream.update().latest()
+            else:
+                data = self.process_block(self.signal_processor.live_signal_buffer.latest(), mode)
+        elif live_stream is not None:
+            # Incremental processing of the new samples, causal
+            data = live_stream.update().latest(channels=channel)
+        else:
+            # Only the displayed channel is copied out of the ring buffer
+            data = self.process_signal(
+                self.signal_processor.live_signal_buffer.latest(channels=channel), mode
+            )
+        if trace_start is not None:
+            self.trace_processed('live', trace_start)
+        return overview, data
+
+    def on_live_processed(self, result):
         """
-        Export the recorded signal (time, value) to a CSV file.
+        Slot for processed live data, emits it unless it became stale.
+
+        Results requested before the last settings change, or of older data
+        than the result shown, are dropped.
 
-        Uses a QFileDialog for file selection. Emits success/failure messages.
+        Parameters:
+        - result (ProcessingResult): Result of process_live_data.
         """
-        if self.recorded_data is None or self.processed_recorded_data is None:
-            QMessageBox.warning(None, "Export Failed", "No data to export.")
+        if result.sequence < self.live_valid_sequence or result.version < self.live_shown_version:
+            self.dropped_results += 1
             return
+        self.live_shown_version = result.version
+        overview, data = result.value
+        if overview:
+            self.live_overview_updated.emit(self.live_data_time_points, data)
+        else:
+            self.processed_live_data = data
+            self.live_data_updated.emit(self.live_data_time_points, data)
+
+    def update_recorded_data(self, settings_changed=False):
+        """
+        Request an update of the recording view with current data.
 
-        file_path, _ = QFileDialog.getSaveFileName(
-            None, "Export data", "", "CSV Files (*.csv);;Text Files (*.txt)"
-        )
-        if not file_path:
-            return  # Cancelled by user
-
-        try:
-            with open(file_path, "w", newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Time", "Value"])  # CSV header
-                for t, v in zip(self.recorded_data_time_points, self.processed_recorded_data):
-                    writer.writerow([t, v])
-            QMessageBox.information(None, "Export successful", f"Data saved to: {file_path}")
-        except Exception as e:
-            QMessageBox.critical(None, "Export failed", str(e))
+        The processing runs on the recording worker; the newest request
+        replaces one that has not started yet. The result is emitted by
+        on_recording_processed.
 
-    def update_live_data(self):
+        Parameters:
+        - settings_changed (bool): True if results of earlier requests are
+          no longer valid, e.g. after zooming or clearing the recording.
         """
-        Update the live signal view with current data.
+        self.recording_rendered_version = self.signal_processor.data_version
+        sequence = self.recording_worker.submit(
+            self.recording_rendered_version,
+            functools.partial(
+                self.process_recorded_data,
+                self.recording_processing_mode, self.recording_channel,
+                self.recording_view_range, self.recording_view_width
+            )
+        )
+        if settings_changed:
+            self.recording_valid_sequence = sequence
 
-        Applies processing mode and emits to connected plots.
+    def process_recorded_data(self, mode, channel, view_range, view_width):
         """
-        if self.is_receiving:
-            self.live_data = self.signal_processor.live_signal
+        Process the recording and summarize the visible range, runs on the recording worker.
 
-        self.processed_live_data = self.process_signal(
-            self.live_data[self.live_channel, :],
-            self.live_processing_mode
-        )
-        self.live_data_updated.emit(self.live_data_time_points, self.processed_live_data)
+        Processed results are cached per channel, mode and parameters, so
+        only samples recorded since the previous update are processed.
+        A clear requested by clear_recording is carried out first.
 
-    def update_recorded_data(self):
-        """
-        Update the recorded signal view with current data and emit signal.
+        Parameters:
+        - mode (str): 'raw', 'rms', 'envelope', or 'filter'
+        - channel (int): Channel index (0-based).
+        - view_range (tuple): Visible (start, stop) in seconds, None for the whole recording.
+        - view_width (int): Plot width in pixels.
 
-        Applies processing mode and recalculates time axis.
+        Returns:
+        - tuple(np.ndarray, np.ndarray): Time in seconds and values of a
+          min/max summary with about two points per pixel.
+        """
+        if self.recording_clear_requested.is_set():
+            self.recording_clear_requested.clear()
+            self.signal_processor.clear_recording()
+        trace_start = time.perf_counter() if self.signal_processor.tracing else None
+
+        factory = self.recording_stream_factories.get(mode)
+        if factory is not None:
+            stream = self.recording_cache.get(
+                channel, mode, self.processing_parameters(mode), factory
+            )
+            num_samples = len(stream.output)
+            pyramid, pyramid_channel = stream.pyramid, 0
+        else:
+            # Raw recording, summarized while it is recorded
+            num_samples = len(self.signal_processor.recording)
+            pyramid = self.signal_processor.recording_pyramid
+            pyramid_channel = channel
+
+        # Plot only about one min/max pair per pixel of the visible range
+        if view_range is None:
+            start, stop = 0, num_samples
+        else:
+            start = int(np.floor(view_range[0] * self.sampling_rate))
+            stop = int(np.ceil(view_range[1] * self.sampling_rate)) + 1
+        positions, values = pyramid.query(start, stop, 2 * view_width, channel=pyramid_channel)
+        if trace_start is not None:
+            self.trace_processed('recording', trace_start)
+        # Short ranges are views of the processed recording, which the
+        # worker may rewrite while the plot still shows them
+        return positions / self.sampling_rate, np.array(values)
+
+    def on_recording_processed(self, result):
         """
-        if self.is_receiving:
-            self.recorded_data = self.signal_processor.recorded_signal
+        Slot for the processed recording view, emits it unless it became stale.
 
-        if self.recorded_data is None:
-            # Use fallback if recorded data not yet initialized
-            self.recorded_data = np.zeros_like(self.signal_processor.live_signal[:, -1:])
+        Results requested before the last settings change, or of older data
+        than the result shown, are dropped.
 
-        self.processed_recorded_data = self.process_signal(
-            self.recorded_data[self.recording_channel, :],
-            self.recording_processing_mode
-        )
-
-        self.recorded_data_time_points = np.linspace(
-            0,
-            self.processed_recorded_data.shape[0] / self.sampling_rate,
-            self.processed_recorded_data.shape[0]
-        )
-        self.recorded_data_updated.emit(
-            self.recorded_data_time_points, self.processed_recorded_data
-        )
+        Parameters:
+        - result (ProcessingResult): Result of process_recorded_data.
+        """
+        if result.sequence < self.recording_valid_sequence or result.version < self.recording_shown_version:
+            self.dropped_results += 1
+            return
+        self.recording_shown_version = result.version
+        self.recorded_data_updated.emit(*result.value)